@@ -1,13 +1,28 @@
 """Agent definitions for the research system."""
 
-from .analysis_agent import analysis_agent_graph
-from .web_research_agent import web_research_agent_graph
-from .credibility_agent import credibility_agent_graph
-from .main_agent import main_agent_graph
-
-__all__ = [
-    "analysis_agent_graph",
-    "web_research_agent_graph",
-    "credibility_agent_graph",
-    "main_agent_graph",
-]
+import importlib
+
+# Exported name -> defining module. Resolved on first access so that importing
+# one agent module doesn't build every agent graph.
+_EXPORTS = {
+    "analysis_agent_graph": "analysis_agent",
+    "web_research_agent_graph": "web_research_agent",
+    "credibility_agent_graph": "credibility_agent",
+    "get_main_agent_graph": "main_agent",
+}
+
+# Names kept for older callers: exported name -> (defining module, builder to call)
+_COMPAT_EXPORTS = {
+    "main_agent_graph": ("main_agent", "get_main_agent_graph"),
+}
+
+__all__ = [*_EXPORTS, *_COMPAT_EXPORTS]
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    if name in _COMPAT_EXPORTS:
+        module, builder = _COMPAT_EXPORTS[name]
+        return getattr(importlib.import_module(f".{module}", __name__), builder)()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,23 +4,21 @@ Analysis Agent - Data analysis specialist with code execution capabilities.
 Handles data processing, visualization creation, statistical analysis, and trend identification.
 """
 
-from datetime import datetime, timezone
 from deepagents.graph import create_agent
 from deepagents import FilesystemMiddleware
-from langchain.agents.middleware import TodoListMiddleware, ToolCallLimitMiddleware
-from langchain_openai import ChatOpenAI
+from langchain.agents.middleware import ToolCallLimitMiddleware
 
-from tools import execute_python_code
-from middleware import make_backend
+from agents.prompt_fragments import EXECUTION_LIMITS_RULE, MEMORY_FILES_RULE, MEMORY_WRITING_FORMAT, SUBAGENT_TOOL_CALL_LIMIT, compact_prompt
+from llms import get_llm
+from tools import execute_python_code, read_memories
+from middleware import CurrentTimeMiddleware, make_backend
 
 
 # =============================================================================
 # SYSTEM PROMPT
 # =============================================================================
 
-CURRENT_TIME = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M %Z")
-
-PROMPT = f"""
+PROMPT = compact_prompt(f"""
 <background>
 - You are an analyst who runs code to generate insights, predictions and plots in a financial team.
 - You will be provided with a task & data inline in the user message - that IS the dataset. Parse it immediately using pandas.
@@ -127,20 +125,16 @@ You have access to persistent long-term memory at `/memories/`:
 - `/memories/source_notes.txt` - Ignore
 - `/memories/coding.txt` - Code mistakes and lessons learned from previous analysis runs
 
-IMPORTANT: ONLY use these 4 memory files. DO NOT create any new .txt files. If a file doesn't exist yet, you can create it, but stick to ONLY these 4 files.**
+{MEMORY_FILES_RULE}
 
-For simple, one-off tasks: Skip memory checks and just do the analysis. For complex tasks like time-series, first read your memories.
+For simple, one-off tasks: Skip memory checks and just do the analysis. For complex tasks like time-series, first read your memories with a single `read_memories` call.
 
 After completing your analysis & ONLY if useful for future notes:
 1. Update memory files (use edit file tool) with 1-2 new learnings about analysis techniques, common pitfalls, etc.
 2. Add coding-specific mistakes/lessons to `/memories/coding.txt` when they will help avoid repeating bugs.
 
-Memory Writing Format:
-- Use markdown format with ## headers for sections
-- Each memory = one bullet point starting with "-"
-- Keep bullets specific and actionable
+{MEMORY_WRITING_FORMAT}
 - Example: "- For time series: always check for seasonality before trend analysis"
-- DO NOT write paragraphs
 <memory_system>
 
 
@@ -184,19 +178,9 @@ Always:
 
 
 <execution_limits>
-CRITICAL: Understand and respect your operational limits.
-
-Tool Call Limit: 15 calls maximum
-- You have a hard limit of 15 tool calls per task via ToolCallLimitMiddleware
-- This includes ALL tool calls: execute_python_code, read_file, write_file, etc.
-- Once you reach 15 calls, you will be stopped and cannot make further progress
-- Do not use many tools on memories and using files
-- Err on the side of caution and do not get close to 15 tool calls
-
-If running low on calls:
-- You have FAILED if you return no visualizations
-- Skip memory updates to preserve calls for core analysis
-- Deliver the most important plot first, then additional ones if budget allows
+{EXECUTION_LIMITS_RULE}
+- Spend few calls on memories and files
+- If running low: skip memory updates and deliver the most important plot first - returning no visualizations is a failure
 </execution_limits>
 
 
@@ -268,13 +252,11 @@ plt.savefig('/home/daytona/outputs/chart.png', dpi=150, bbox_inches='tight')
 plt.close()
 ```
 <visual_guidelines>
+""")
 
-
-
-<current_date_time>
-Current time: {CURRENT_TIME}
-<current_date_time>
-"""
+CURRENT_TIME_PROMPT = """<current_date_time>
+Current time: {current_time}
+<current_date_time>"""
 
 
 # =============================================================================
@@ -282,11 +264,12 @@ Current time: {CURRENT_TIME}
 # =============================================================================
 
 analysis_agent_graph = create_agent(
-    ChatOpenAI(model="gpt-5.1-2025-11-13", max_retries=3),
+    get_llm(),
     system_prompt=PROMPT,
-    tools=[execute_python_code],
+    tools=[execute_python_code, read_memories],
     middleware=[
         FilesystemMiddleware(backend=make_backend),
-        ToolCallLimitMiddleware(run_limit=15),
+        ToolCallLimitMiddleware(run_limit=SUBAGENT_TOOL_CALL_LIMIT),
+        CurrentTimeMiddleware(CURRENT_TIME_PROMPT),
     ],
 )
@@ -4,23 +4,21 @@ Credibility Agent - Fact-checking and source verification specialist.
 Handles claim verification, source assessment, consistency checking, and bias identification.
 """
 
-from datetime import datetime, timezone
 from deepagents.graph import create_agent
 from deepagents import FilesystemMiddleware
-from langchain.agents.middleware import TodoListMiddleware, ToolCallLimitMiddleware
-from langchain_openai import ChatOpenAI
+from langchain.agents.middleware import ToolCallLimitMiddleware
 
-from tools import web_search
-from middleware import make_backend
+from agents.prompt_fragments import EXECUTION_LIMITS_RULE, MEMORY_WRITING_FORMAT, SUBAGENT_TOOL_CALL_LIMIT, compact_prompt
+from llms import get_llm
+from tools import search_cache_ttl, web_search
+from middleware import CurrentTimeMiddleware, ToolCacheMiddleware, make_backend
 
 
 # =============================================================================
 # SYSTEM PROMPT
 # =============================================================================
 
-CURRENT_TIME = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M %Z")
-
-PROMPT = f"""<background>
+PROMPT = compact_prompt(f"""<background>
 You are a credibility and fact-checking specialist. Your role is to:
 
 1. **Verify Claims**: Check if claims are supported by reliable evidence
@@ -53,12 +51,7 @@ Your final response should only be 1/2 page long. Keep it concise.
 
 
 <execution_limits>
-CRITICAL: Understand and respect your operational limits.
-
-Tool Call Limit: 15 calls maximum
-- You have a hard limit of 15 tool calls per task via ToolCallLimitMiddleware
-- This includes ALL tool calls: web_search, read_file, write_file, etc.
-- Once you reach 15 calls, you will be stopped and cannot make further progress
+{EXECUTION_LIMITS_RULE}
 <execution_limits>
 
 
@@ -117,21 +110,11 @@ You have access to persistent long-term memory at `/memories/`:
 Optionally update memory files with 1-2 new learnings about sources, verification methods, etc.
 Only add memories if these will help in future investigations
 
-Memory Writing Format:
-- Use markdown format with ## headers for sections
-- Each memory = one bullet point starting with "-"
-- Keep bullets specific and actionable
+{MEMORY_WRITING_FORMAT}
 - Example: "- Check Stack Overflow answer dates - old answers may use deprecated APIs"
 - Example: "- Cross-reference claims across 3+ sources before accepting as fact"
-- DO NOT write paragraphs
 <memory_system>
-
-
-
-<current_date_time>
-{CURRENT_TIME}
-<current_date_time>
-"""
+""")
 
 
 # =============================================================================
@@ -139,11 +122,13 @@ Memory Writing Format:
 # =============================================================================
 
 credibility_agent_graph = create_agent(
-    ChatOpenAI(model="gpt-5.1-2025-11-13", max_retries=3),
+    get_llm(),
     system_prompt=PROMPT,
     tools=[web_search],
     middleware=[
         FilesystemMiddleware(backend=make_backend),
-        ToolCallLimitMiddleware(run_limit=15),
+        ToolCallLimitMiddleware(run_limit=SUBAGENT_TOOL_CALL_LIMIT),
+        ToolCacheMiddleware(tool_names=("web_search",), ttl=search_cache_ttl),
+        CurrentTimeMiddleware(),
     ],
 )
@@ -12,32 +12,32 @@ Features:
 - Automatic context compaction (built into framework at ~170k tokens)
 """
 
-from datetime import datetime, timezone
-
-from deepagents import create_deep_agent
-from langchain_openai import ChatOpenAI
-
-from tools import web_search
-from middleware import MemoryCleanupMiddleware, make_backend
-
-
-# =============================================================================
-# IMPORT SUB-AGENTS
-# =============================================================================
-
-from agents.analysis_agent import analysis_agent_graph
-from agents.web_research_agent import web_research_agent_graph
-from agents.credibility_agent import credibility_agent_graph
-
+import importlib
+from functools import lru_cache
+from typing import Final, Literal, NamedTuple
+
+from deepagents import CompiledSubAgent, create_deep_agent
+
+from agents.prompt_fragments import MEMORY_FILES_RULE, MEMORY_WRITING_FORMAT, compact_prompt
+from llms import get_llm
+from tools import read_memories, search_cache_ttl, web_search
+from middleware import (
+    BudgetGovernorMiddleware,
+    CurrentTimeMiddleware,
+    MemoryCleanupMiddleware,
+    SubagentDispatchMiddleware,
+    ToolCacheMiddleware,
+    ToolOutputCompressionMiddleware,
+    make_backend,
+)
+from middleware.budget_governor import SUPERVISOR_RECURSION_LIMIT
 
 
 # =============================================================================
 # SYSTEM PROMPT
 # =============================================================================
 
-CURRENT_TIME = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M %Z")
-
-SYSTEM_PROMPT = f"""<background>
+SYSTEM_PROMPT = compact_prompt(f"""<background>
 You are a Markets Research & Portfolio Risk Orchestrator for professional equity and multi-asset traders.
 Your job is to monitor, analyze, verify, and synthesize market-moving developments from the last 12 months, and to produce concise, source-backed reports explaining how those developments affect specific stocks, sectors, and institutional portfolios.
 You should consider 12 month changes within the context of longer time-horizon trends and provide these in the report as context.
@@ -194,7 +194,7 @@ CRITICAL: You operate reactively, not linearly.
    - Your todo list should GROW and EVOLVE as you work
 
 4. PARALLEL EXECUTION WHERE POSSIBLE
-   - Launch multiple independent sub-agent calls in parallel
+   - Launch multiple independent sub-agent calls in parallel by emitting all of them in the SAME response
    - But wait for results before planning dependent next steps
    - React to what you learn before blindly continuing
 
@@ -221,17 +221,13 @@ You have access to persistent long-term memory at /memories:
 - /memories/source_notes.txt - Ignore
 - /memories/coding.txt - Ignore
 
-IMPORTANT: ONLY use these 4 memory files. DO NOT create any new .txt files. If a file doesn't exist yet, you can create it, but stick to ONLY these 4 files.
+{MEMORY_FILES_RULE}
 
-Read memories at the start of a task assigned to you always. Optionally update (use edit file tool) 1-2 memories occasionally - only do this if there is useful information for the future.
+Read memories at the start of a task assigned to you always, with a single `read_memories` call. Optionally update (use edit file tool) 1-2 memories occasionally - only do this if there is useful information for the future.
 
-Memory Writing Format:
-   - Use markdown format with ## headers for sections
-   - Each memory = one bullet point starting with "-"
-   - Keep bullets specific and actionable
-   - Example: "- reuters.com (5/5) - Reliable for breaking news, minimal bias"
-   - Example: "- Search with 'vs' to find comparisons (e.g., 'Redis vs Memcached')"
-   - DO NOT write paragraphs
+{MEMORY_WRITING_FORMAT}
+- Example: "- reuters.com (5/5) - Reliable for breaking news, minimal bias"
+- Example: "- Search with 'vs' to find comparisons (e.g., 'Redis vs Memcached')"
 
 The scratchpad is temporary.
 Persistent knowledge goes only into /memories/.
@@ -371,13 +367,12 @@ Use up your full tool limits without exceeding them for the demo.
    3. Reference the supporting evidence (data points, sources, analysis)
    4. Note any caveats or conditions
 <final_output>
+""")
 
-
-
-<current_date_time>
-Use this date and time to know what the given 12 months refers to when assessing markets: {CURRENT_TIME}
-<current_date_time>
-"""
+# Appended per run by CurrentTimeMiddleware, after every other prompt section
+CURRENT_TIME_PROMPT: Final[str] = """<current_date_time>
+Use this date and time to know what the given 12 months refers to when assessing markets: {current_time}
+<current_date_time>"""
 
 
 
@@ -385,41 +380,79 @@ Use this date and time to know what the given 12 months refers to when assessing
 # SUB-AGENT CONFIGURATIONS
 # =============================================================================
 
-# Define sub-agents as runnable specs using the standalone agent graphs
-subagents = [
-    {
-        "name": "analysis-agent",
-        "description": """Data analysis specialist for processing data, creating visualizations,
-            statistical analysis, and trend identification. Use when you need plots,
-            graphs, calculations, or any code-based analysis.""",
-        "runnable": analysis_agent_graph,
-    },
-    {
-        "name": "web-research-agent",
-        "description": """Web research specialist for searching the internet, gathering information,
-            finding sources, and collecting raw data on topics. Use for initial
-            research and fact-finding. Always call with ONE focused research topic. For multiple topics, call multiple times in parallel""",
-        "runnable": web_research_agent_graph,
-    },
-    {
-        "name": "credibility-agent",
-        "description": """Credibility and fact-checking specialist. Use to verify any questionable research outputs,
-            check source reliability, validate claims, and ensure findings are
-            trustworthy and defensible. ALWAYS use before finalizing reports.""",
-        "runnable": credibility_agent_graph,
-    },
-]
+ANALYSIS_AGENT_DESCRIPTION: Final[str] = (
+    "Data analysis specialist: processes data, creates visualizations, runs statistical "
+    "analysis and identifies trends. Use when you need plots, graphs, calculations or any "
+    "code-based analysis."
+)
+WEB_RESEARCH_AGENT_DESCRIPTION: Final[str] = (
+    "Web research specialist: searches the internet, gathers information, finds sources and "
+    "collects raw data. Use for initial research and fact-finding. Call with ONE focused "
+    "research topic; for multiple topics, emit one call per topic in the same response."
+)
+CREDIBILITY_AGENT_DESCRIPTION: Final[str] = (
+    "Credibility and fact-checking specialist: verifies questionable research outputs, checks "
+    "source reliability, validates claims and ensures findings are trustworthy and defensible. "
+    "ALWAYS use before finalizing reports."
+)
+
+
+SubagentName = Literal["analysis-agent", "web-research-agent", "credibility-agent"]
+
+
+class SubagentSpec(NamedTuple):
+    """A sub-agent and where its compiled graph lives."""
+
+    name: SubagentName
+    description: str
+    module: str
+    graph: str
+
+
+SUBAGENTS: Final[tuple[SubagentSpec, ...]] = (
+    SubagentSpec("analysis-agent", ANALYSIS_AGENT_DESCRIPTION, "agents.analysis_agent", "analysis_agent_graph"),
+    SubagentSpec("web-research-agent", WEB_RESEARCH_AGENT_DESCRIPTION, "agents.web_research_agent", "web_research_agent_graph"),
+    SubagentSpec("credibility-agent", CREDIBILITY_AGENT_DESCRIPTION, "agents.credibility_agent", "credibility_agent_graph"),
+)
+SUBAGENTS_BY_NAME: Final[dict[SubagentName, SubagentSpec]] = {spec.name: spec for spec in SUBAGENTS}
+
+
+def build_subagents() -> list[CompiledSubAgent]:
+    """
+    Sub-agent runnable specs using the standalone agent graphs.
+
+    Graph modules are imported here rather than at module top so that
+    importing this module doesn't compile the three sub-agent graphs.
+    """
+    return [
+        {
+            "name": spec.name,
+            "description": spec.description,
+            "runnable": getattr(importlib.import_module(spec.module), spec.graph),
+        }
+        for spec in SUBAGENTS
+    ]
 
 
 # =============================================================================
 # CREATE AGENT
 # =============================================================================
 
-main_agent_graph = create_deep_agent(
-    tools=[web_search],
-    system_prompt=SYSTEM_PROMPT,
-    subagents=subagents,
-    backend=make_backend,
-    model=ChatOpenAI(model="gpt-5.1-2025-11-13", max_retries=3),
-    middleware=[MemoryCleanupMiddleware(max_memories_per_file=30)]
-).with_config({"recursion_limit": 1000})
+@lru_cache(maxsize=1)
+def get_main_agent_graph():
+    """Build the main agent graph once per process; later calls return the same graph."""
+    return create_deep_agent(
+        tools=[web_search, read_memories],
+        system_prompt=SYSTEM_PROMPT,
+        subagents=build_subagents(),
+        backend=make_backend,
+        model=get_llm(),
+        middleware=[
+            BudgetGovernorMiddleware(),
+            ToolCacheMiddleware(ttl=search_cache_ttl),
+            ToolOutputCompressionMiddleware(),
+            SubagentDispatchMiddleware(),
+            MemoryCleanupMiddleware(max_memories_per_file=30),
+            CurrentTimeMiddleware(CURRENT_TIME_PROMPT),
+        ],
+    ).with_config({"recursion_limit": SUPERVISOR_RECURSION_LIMIT})
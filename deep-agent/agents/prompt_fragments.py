@@ -0,0 +1,40 @@
+"""
+Prompt Fragments - system prompt blocks shared by the main agent and sub-agents.
+
+Every agent reads and writes the same /memories/ files and sub-agents share
+one tool-call budget, so those rules are defined once here. Each agent
+imports the same strings, so the rules stay byte-identical across prompts.
+"""
+
+import re
+from typing import Final
+
+
+SUBAGENT_TOOL_CALL_LIMIT: Final[int] = 15
+
+# Enforced by ToolCallLimitMiddleware(run_limit=SUBAGENT_TOOL_CALL_LIMIT); the prose only has to explain it
+EXECUTION_LIMITS_RULE: Final[str] = (
+    f"Tool budget: {SUBAGENT_TOOL_CALL_LIMIT} calls per task, counting every tool (including file and memory "
+    "reads/writes). Calls over the budget are rejected, so keep enough calls to finish and write your answer."
+)
+
+MEMORY_FILES_RULE: Final[str] = (
+    "IMPORTANT: ONLY use these 4 memory files. DO NOT create any new .txt files. "
+    "If a file doesn't exist yet, you can create it, but stick to ONLY these 4 files."
+)
+
+MEMORY_WRITING_FORMAT: Final[str] = """Memory Writing Format:
+- Use markdown format with ## headers for sections
+- Each memory = one bullet point starting with "-"
+- Keep bullets specific and actionable
+- DO NOT write paragraphs"""
+
+
+
+_TRAILING_SPACE_RE = re.compile(r"[ \t]+\n")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def compact_prompt(text: str) -> str:
+    """Drop trailing spaces and collapse runs of blank lines; the source layout isn't worth tokens."""
+    return _BLANK_LINES_RE.sub("\n\n", _TRAILING_SPACE_RE.sub("\n", text)).strip()
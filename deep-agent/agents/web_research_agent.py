@@ -4,23 +4,21 @@ Web Research Agent - Web browsing and information gathering specialist.
 Handles web searches, data gathering, source documentation, and initial quality assessment.
 """
 
-from datetime import datetime, timezone
 from deepagents.graph import create_agent
 from deepagents import FilesystemMiddleware
-from langchain.agents.middleware import TodoListMiddleware, ToolCallLimitMiddleware
-from langchain_openai import ChatOpenAI
+from langchain.agents.middleware import ToolCallLimitMiddleware
 
-from tools import web_search
-from middleware import make_backend
+from agents.prompt_fragments import EXECUTION_LIMITS_RULE, MEMORY_WRITING_FORMAT, SUBAGENT_TOOL_CALL_LIMIT, compact_prompt
+from llms import get_llm
+from tools import read_memories, search_cache_ttl, web_search, web_search_batch
+from middleware import CurrentTimeMiddleware, ToolCacheMiddleware, make_backend
 
 
 # =============================================================================
 # SYSTEM PROMPT
 # =============================================================================
 
-CURRENT_TIME = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M %Z")
-
-PROMPT = f"""<background>
+PROMPT = compact_prompt(f"""<background>
 You are a web research specialist, specialising in research. Your role is to:
 
 1. Find Information**: Search for relevant, reliable sources
@@ -55,6 +53,8 @@ You have `web_search` for searching the web with options for:
 - General, news, or finance-focused searches
 - Configurable result count
 - Optional raw page content
+
+and `web_search_batch` to run several queries at once. It counts as ONE tool call, so use it whenever you have 2+ queries planned.
 <tools>
 
 
@@ -70,27 +70,11 @@ You have `web_search` for searching the web with options for:
 
 
 <execution_limits>
-CRITICAL: Understand and respect your operational limits.
-
-Tool Call Limit: 15 calls maximum
-- You have a hard limit of 15 tool calls per task via ToolCallLimitMiddleware
-- This includes ALL tool calls: web_search, read_file, write_file, etc.
-- Once you reach 15 calls, you will be stopped and cannot make further progress
-- Air on the side of caution and stay below 15 tool calls
-
-How to handle these limits:
-1. Plan your searches strategically - Decide on your 3-5 most important search queries upfront
-2. Use broad-to-narrow approach - Start with general searches, then refine based on what you find
-3. Prioritize high-value searches - News/finance searches for market data, general searches for context
-4. Track your usage mentally - Keep rough count of calls made (aim to use max 10-12 for searches, reserve 3-5 for file operations)
-5. Fail gracefully - If you're running low on calls, summarize what you've found and note gaps
-6. Avoid redundant searches - Don't search the same thing twice with slightly different wording. Do not waste many tool calls on memories and files.
-
-
-To guarantee completion:
-1. Return data inline - The orchestrator and analysis agent cannot access files you create; data must be in your response
-2. Summarize efficiently - Don't spend all calls on research; save capacity to write proper responses
-3. Early stopping - If running low on calls: stop searching and compile what you have
+{EXECUTION_LIMITS_RULE}
+- Plan your 3-5 most important searches upfront, broad to narrow (news/finance for market data, general for context), and run each topic's queries in one `web_search_batch` call
+- Use at most 10-12 calls for searches and keep 3-5 for files and memories; never repeat a search with slightly different wording
+- Return data inline - the orchestrator and analysis agent cannot access files you create
+- If running low on calls, stop searching and compile what you have, noting gaps
 <execution_limits>
 
 
@@ -132,23 +116,13 @@ You have access to persistent long-term memory at `/memories/`:
 Optionally update memory files with 1-2 new learnings about sources, search tactics, etc. (do NOT modify `/memories/coding.txt`)
 Only do this if there is useful information for the future.
 
-For simple, one-off tasks: Skip memory checks and just do the analysis. For complex tasks or ones involving many sources, first read your memories.
+For simple, one-off tasks: Skip memory checks and just do the analysis. For complex tasks or ones involving many sources, first read your memories with a single `read_memories` call.
 
-Memory Writing Format:
-- Use markdown format with ## headers for sections
-- Each memory = one bullet point starting with "-"
-- Keep bullets specific and actionable
+{MEMORY_WRITING_FORMAT}
 - Example: "- reuters.com (5/5) - Reliable for breaking news, minimal bias"
 - Example: "- Search with 'vs' to find comparisons (e.g., 'Redis vs Memcached')"
-- DO NOT write paragraphs
 <memory_system>
-
-
-
-<current_date_time>
-{CURRENT_TIME}
-<current_date_time>
-"""
+""")
 
 
 # =============================================================================
@@ -156,11 +130,15 @@ Memory Writing Format:
 # =============================================================================
 
 web_research_agent_graph = create_agent(
-    ChatOpenAI(model="gpt-5.1-2025-11-13", max_retries=3),
+    get_llm(),
     system_prompt=PROMPT,
-    tools=[web_search],
+    tools=[web_search, web_search_batch, read_memories],
     middleware=[
         FilesystemMiddleware(backend=make_backend),
-        ToolCallLimitMiddleware(run_limit=15),
+        ToolCallLimitMiddleware(run_limit=SUBAGENT_TOOL_CALL_LIMIT),
+        # Batches aren't cached: a failed query comes back inside a normal result, and each
+        # search in a batch already goes through web_search's own FileCache
+        ToolCacheMiddleware(tool_names=("web_search",), ttl=search_cache_ttl),
+        CurrentTimeMiddleware(),
     ],
 )
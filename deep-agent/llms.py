@@ -0,0 +1,123 @@
+"""
+Shared LLM clients - one connection pool and rate limit for every ChatOpenAI instance.
+
+The supervisor, the sub-agents and the middleware LLMs all talk to the same
+API host. Sharing one pooled HTTP/2 client (per event loop on the async path)
+lets concurrent sub-agent calls multiplex over warm connections instead of each
+model opening its own pool and paying a fresh TCP + TLS handshake.
+
+Retries are left to the OpenAI SDK (max_retries on each model), which already
+backs off exponentially with jitter and honours Retry-After on 429s.
+"""
+
+import asyncio
+import atexit
+import os
+import weakref
+from functools import lru_cache
+
+import httpx
+from langchain_core.rate_limiters import InMemoryRateLimiter
+
+
+# =============================================================================
+# CONNECTION POOL
+# =============================================================================
+
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+# Long read timeout: reasoning-model responses can take minutes to arrive
+HTTP_TIMEOUT = httpx.Timeout(600.0, connect=5.0)
+
+
+@lru_cache(maxsize=1)
+def get_http_client() -> httpx.Client:
+    """Shared sync HTTP/2 client, created on first use rather than at import."""
+    return httpx.Client(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+
+
+@atexit.register
+def _close_http_client() -> None:
+    """Close the sync client if it was created; async connections go with their event loop's teardown."""
+    if get_http_client.cache_info().currsize:
+        get_http_client().close()
+
+
+class LoopLocalAsyncClient(httpx.AsyncClient):
+    """AsyncClient that sends through one pooled client per running event loop.
+
+    Pooled connections belong to the event loop that opened them, so a single
+    shared client breaks ("Event loop is closed") once a second loop - a new
+    asyncio.run() or a per-test loop - reuses it. Each loop gets its own inner
+    client instead; it is dropped with the loop, whose teardown reclaims the sockets.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._client_kwargs = kwargs
+        self._loop_clients = weakref.WeakKeyDictionary()
+
+    def _loop_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._loop_clients.get(loop)
+        if client is None:
+            client = self._loop_clients[loop] = httpx.AsyncClient(**self._client_kwargs)
+        return client
+
+    async def send(self, request, **kwargs):
+        return await self._loop_client().send(request, **kwargs)
+
+    async def aclose(self) -> None:
+        client = self._loop_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+        await super().aclose()
+
+
+@lru_cache(maxsize=1)
+def get_http_async_client() -> httpx.AsyncClient:
+    """Shared async HTTP/2 client, pooled per event loop."""
+    return LoopLocalAsyncClient(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+
+
+# =============================================================================
+# RATE LIMITING
+# =============================================================================
+
+def _make_rate_limiter():
+    """Shared request-rate cap for the agent models, set via OPENAI_REQUESTS_PER_SECOND."""
+    requests_per_second = os.getenv("OPENAI_REQUESTS_PER_SECOND")
+    if not requests_per_second:
+        return None
+    return InMemoryRateLimiter(
+        requests_per_second=float(requests_per_second),
+        check_every_n_seconds=0.1,
+        max_bucket_size=max(1.0, float(requests_per_second)),
+    )
+
+
+# One bucket for the supervisor and every sub-agent, so a parallel fan-out
+# is throttled as a whole instead of per model instance
+rate_limiter = _make_rate_limiter()
+
+
+# =============================================================================
+# MODEL FACTORY
+# =============================================================================
+
+DEFAULT_MODEL = "gpt-5.1-2025-11-13"
+
+
+@lru_cache(maxsize=8)
+def get_llm(model: str = DEFAULT_MODEL, **kwargs):
+    """ChatOpenAI wired to the shared connection pool and rate limit, one instance per configuration."""
+    # Resolved at call time so importing this module stays cheap
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        model=model,
+        max_retries=3,
+        http_client=get_http_client(),
+        http_async_client=get_http_async_client(),
+        rate_limiter=rate_limiter,
+        **kwargs,
+    )
@@ -1,6 +1,20 @@
 """Custom middleware and memory backend for the research agent system."""
 
+from .budget_governor import BudgetGovernorMiddleware
+from .current_time import CurrentTimeMiddleware, current_time
 from .memory_cleanup import MemoryCleanupMiddleware
 from .memory_backend import make_backend
+from .subagent_dispatch import SubagentDispatchMiddleware
+from .tool_cache import ToolCacheMiddleware
+from .tool_output_compression import ToolOutputCompressionMiddleware
 
-__all__ = ["MemoryCleanupMiddleware", "make_backend"]
+__all__ = [
+    "BudgetGovernorMiddleware",
+    "CurrentTimeMiddleware",
+    "current_time",
+    "MemoryCleanupMiddleware",
+    "make_backend",
+    "SubagentDispatchMiddleware",
+    "ToolCacheMiddleware",
+    "ToolOutputCompressionMiddleware",
+]
@@ -0,0 +1,127 @@
+"""
+Budget Governor Middleware - cost-based early stop for the supervisor.
+
+The recursion limit is only a hard backstop. This middleware tracks the
+supervisor's token spend, tool calls and wall-clock time for each run. Once
+any budget is exhausted, the next model call goes out without tools, so the
+agent has to write its final report with what it already has instead of
+looping on until it crashes into the recursion limit.
+
+Sub-agent spend isn't visible here; it is capped separately by each
+sub-agent's ToolCallLimitMiddleware.
+
+The defaults leave room under SUPERVISOR_RECURSION_LIMIT: one supervisor
+turn costs several graph supersteps, so the turn and tool-call budgets must
+run out well before the step count does.
+"""
+
+import time
+from typing import Annotated, NotRequired
+
+from langchain.agents.middleware import AgentMiddleware, AgentState
+from langchain.agents.middleware.types import PrivateStateAttr
+from langchain_core.messages import AIMessage, HumanMessage
+
+
+# Hard step cap of the supervisor graph (LangGraph recursion_limit)
+SUPERVISOR_RECURSION_LIMIT = 400
+# Supersteps one supervisor turn costs: before_model hooks, the model, after_model hooks, tools
+SUPERSTEPS_PER_TURN = 4
+
+
+# =============================================================================
+# WRAP-UP PROMPT
+# =============================================================================
+
+BUDGET_EXHAUSTED_PROMPT = """Your research budget is exhausted ({reason}). You can no longer call tools or sub-agents.
+
+Write the final report now using only the findings, sources and plot URLs you already have.
+Note any gaps briefly instead of apologising for them."""
+
+
+class BudgetState(AgentState):
+    """Per-run budget counters, kept out of the graph's input/output schema."""
+
+    budget_started_at: NotRequired[Annotated[float, PrivateStateAttr]]
+    budget_tokens_used: NotRequired[Annotated[int, PrivateStateAttr]]
+    budget_tool_calls: NotRequired[Annotated[int, PrivateStateAttr]]
+    budget_model_calls: NotRequired[Annotated[int, PrivateStateAttr]]
+
+
+class BudgetGovernorMiddleware(AgentMiddleware):
+    """Forces a tools-free final answer once the run's token, turn, tool-call or time budget is spent."""
+
+    state_schema = BudgetState
+
+    def __init__(
+        self,
+        max_tokens: int = 2_000_000,
+        max_model_calls: int = 60,
+        max_tool_calls: int = 60,
+        max_seconds: float = 1800,
+    ):
+        self.max_tokens = max_tokens
+        self.max_model_calls = max_model_calls
+        self.max_tool_calls = max_tool_calls
+        self.max_seconds = max_seconds
+
+    def before_agent(self, state, runtime):
+        """Start a fresh budget for every run."""
+        return {
+            "budget_started_at": time.time(),
+            "budget_tokens_used": 0,
+            "budget_tool_calls": 0,
+            "budget_model_calls": 0,
+        }
+
+    def after_model(self, state, runtime):
+        """Charge the latest model response against the budget."""
+        message = state["messages"][-1] if state["messages"] else None
+        if not isinstance(message, AIMessage):
+            return None
+
+        usage = message.usage_metadata or {}
+        return {
+            "budget_tokens_used": state.get("budget_tokens_used", 0) + usage.get("total_tokens", 0),
+            "budget_tool_calls": state.get("budget_tool_calls", 0) + len(message.tool_calls),
+            "budget_model_calls": state.get("budget_model_calls", 0) + 1,
+        }
+
+    def wrap_model_call(self, request, handler):
+        """Strip the tools from the model call once the budget is exhausted."""
+        return handler(self._apply_budget(request))
+
+    async def awrap_model_call(self, request, handler):
+        """Async variant used when the supervisor runs under asyncio."""
+        return await handler(self._apply_budget(request))
+
+    def exhausted_reason(self, state):
+        """Describe which budget ran out, or None while there is budget left."""
+        tokens = state.get("budget_tokens_used", 0)
+        if tokens >= self.max_tokens:
+            return f"{tokens} of {self.max_tokens} tokens used"
+
+        model_calls = state.get("budget_model_calls", 0)
+        if model_calls >= self.max_model_calls:
+            return f"{model_calls} of {self.max_model_calls} model turns used"
+
+        tool_calls = state.get("budget_tool_calls", 0)
+        if tool_calls >= self.max_tool_calls:
+            return f"{tool_calls} of {self.max_tool_calls} tool calls used"
+
+        started_at = state.get("budget_started_at")
+        if started_at is not None and time.time() - started_at >= self.max_seconds:
+            return f"{self.max_seconds:.0f}s time limit reached"
+        return None
+
+    def _apply_budget(self, request):
+        reason = self.exhausted_reason(request.state)
+        if reason is None:
+            return request
+
+        print(f"⚠️ Budget exhausted ({reason}), asking for the final report")
+        return request.override(
+            tools=[],
+            tool_choice=None,
+            messages=[*request.messages, HumanMessage(content=BUDGET_EXHAUSTED_PROMPT.format(reason=reason))],
+        )
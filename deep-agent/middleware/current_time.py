@@ -0,0 +1,64 @@
+"""
+Current Time Middleware - fresh, per-run timestamp in the system prompt.
+
+A timestamp baked into the prompt at import goes stale once the server has
+been up for a while. This middleware records the time when each run starts
+and appends it to the very end of the system prompt. The time is frozen for
+the whole run, and everything before it stays byte-identical, so the
+provider's prompt cache keeps hitting on the static prefix.
+"""
+
+from datetime import datetime, timezone
+from typing import Annotated, NotRequired
+
+from langchain.agents.middleware import AgentMiddleware, AgentState
+from langchain.agents.middleware.types import PrivateStateAttr
+from langchain_core.messages import SystemMessage
+
+
+DEFAULT_TEMPLATE = """<current_date_time>
+{current_time}
+<current_date_time>"""
+
+
+def current_time() -> str:
+    """Current UTC time as shown to the agents, e.g. '2025-01-31 14:05 UTC'."""
+    return f"{datetime.now(timezone.utc):%Y-%m-%d %H:%M} UTC"
+
+
+class CurrentTimeState(AgentState):
+    """Run start time, kept out of the graph's input/output schema."""
+
+    current_time: NotRequired[Annotated[str, PrivateStateAttr]]
+
+
+class CurrentTimeMiddleware(AgentMiddleware):
+    """Appends the run's start time to the end of the system prompt."""
+
+    state_schema = CurrentTimeState
+
+    def __init__(self, template: str = DEFAULT_TEMPLATE):
+        self.template = template
+
+    def before_agent(self, state, runtime):
+        """Freeze the time for this run."""
+        return {"current_time": current_time()}
+
+    def wrap_model_call(self, request, handler):
+        """Add the time block after every other system prompt section."""
+        return handler(self._with_time(request))
+
+    async def awrap_model_call(self, request, handler):
+        """Async variant used when the agent runs under asyncio."""
+        return await handler(self._with_time(request))
+
+    def _with_time(self, request):
+        block = self.template.format(current_time=request.state.get("current_time") or current_time())
+        system_message = request.system_message
+        if system_message is None:
+            return request.override(system_message=SystemMessage(content=block))
+        if isinstance(system_message.content, str):
+            content = f"{system_message.content}\n\n{block}"
+        else:
+            content = [*system_message.content, {"type": "text", "text": block}]
+        return request.override(system_message=SystemMessage(content=content))
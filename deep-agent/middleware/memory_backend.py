@@ -13,6 +13,11 @@ def make_backend(runtime):
 
     The runtime supplies the store; LangGraph API handles persistence so
     we don't provision our own store here.
+
+    Deliberately not cached: StateBackend reads and writes the state of the
+    runtime it is built with, so a shared instance would leak files between
+    runs. Construction only wraps objects the runtime already holds - no
+    connections are opened here.
     """
     return CompositeBackend(
         default=StateBackend(runtime),
@@ -4,9 +4,14 @@ Memory Cleanup Middleware - LLM-based memory trimming.
 Keeps only the best N memories per .txt file using LLM selection.
 """
 
+import asyncio
+import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+
 from langchain.agents.middleware import AgentMiddleware
-from langchain_openai import ChatOpenAI
+
+from llms import get_llm
 
 
 # =============================================================================
@@ -28,6 +33,42 @@ Rules:
 - Return ONLY the trimmed content, no code blocks or explanations
 """
 
+# Memory files trimmed at once; each trim is an independent LLM round trip
+MAX_PARALLEL_TRIMS = 4
+
+# A ```/```markdown fence wrapped around the whole reply
+_FENCE_RE = re.compile(r"\A```(?:markdown)?[ \t]*\n?|\n?```\Z")
+
+# Store pages fetched per search call; BaseStore.search returns only 10 items by default
+SEARCH_PAGE_SIZE = 100
+
+
+def iter_memory_files(store):
+    """Yield every /memories/*.txt item, paging through the filesystem namespace."""
+    # Store filters match value fields, not keys, so the path filter has to run here
+    offset = 0
+    while True:
+        page = store.search(("filesystem",), limit=SEARCH_PAGE_SIZE, offset=offset)
+        for item in page:
+            if item.key.startswith("/memories/") and item.key.endswith(".txt"):
+                yield item
+        if len(page) < SEARCH_PAGE_SIZE:
+            return
+        offset += SEARCH_PAGE_SIZE
+
+
+async def aiter_memory_files(store):
+    """Async variant of iter_memory_files."""
+    offset = 0
+    while True:
+        page = await store.asearch(("filesystem",), limit=SEARCH_PAGE_SIZE, offset=offset)
+        for item in page:
+            if item.key.startswith("/memories/") and item.key.endswith(".txt"):
+                yield item
+        if len(page) < SEARCH_PAGE_SIZE:
+            return
+        offset += SEARCH_PAGE_SIZE
+
 
 class MemoryCleanupMiddleware(AgentMiddleware):
     """LLM-based memory trimmer that keeps only the best N memories per .txt file."""
@@ -35,7 +76,9 @@ class MemoryCleanupMiddleware(AgentMiddleware):
     def __init__(self, store_instance=None, max_memories_per_file: int = 30, cleanup_model: str = "gpt-4o-mini"):
         self.max_memories = max_memories_per_file
         self.store = store_instance
-        self.llm = ChatOpenAI(model=cleanup_model, temperature=0)
+        self.llm = get_llm(cleanup_model, temperature=0)
+        # (namespace, key) -> updated_at of files that need no further trimming
+        self._checked = {}
 
     def after_agent(self, state, runtime):
         """Trim all .txt memory files after each agent run."""
@@ -44,57 +87,165 @@ class MemoryCleanupMiddleware(AgentMiddleware):
             if store is None:
                 return None
 
-            # Find all .txt files in /memories/
-            all_items = list(store.search(("filesystem",)))
-            txt_files = [item for item in all_items if item.key.startswith("/memories/") and item.key.endswith(".txt")]
+            pending = [txt_file for txt_file in iter_memory_files(store) if self._needs_check(txt_file)]
+            if not pending:
+                return None
+
+            with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_TRIMS, len(pending))) as pool:
+                done = list(pool.map(lambda txt_file: self._trim_file(store, txt_file), pending))
+            self._mark_checked(pending, done)
+        except Exception as e:
+            print(f"⚠️ Memory cleanup failed: {e}")
+
+        return None
+
+    async def aafter_agent(self, state, runtime):
+        """Async variant used when the agent runs under asyncio, so store and LLM calls don't hold a thread."""
+        try:
+            store = self.store or getattr(runtime, "store", None)
+            if store is None:
+                return None
+
+            pending = [txt_file async for txt_file in aiter_memory_files(store) if self._needs_check(txt_file)]
+            if not pending:
+                return None
+
+            slots = asyncio.Semaphore(MAX_PARALLEL_TRIMS)
+
+            async def trim(txt_file):
+                async with slots:
+                    return await self._atrim_file(store, txt_file)
 
-            for txt_file in txt_files:
-                self._trim_file(store, txt_file)
+            done = await asyncio.gather(*(trim(txt_file) for txt_file in pending))
+            self._mark_checked(pending, done)
         except Exception as e:
             print(f"⚠️ Memory cleanup failed: {e}")
 
         return None
 
+    @staticmethod
+    def _file_id(file_item):
+        return (tuple(file_item.namespace), file_item.key)
+
+    def _needs_check(self, file_item):
+        """False if the file is unchanged since it was last found within the limit."""
+        return self._checked.get(self._file_id(file_item)) != file_item.updated_at
+
+    def _mark_checked(self, file_items, within_limit):
+        for file_item, ok in zip(file_items, within_limit):
+            if ok:
+                self._checked[self._file_id(file_item)] = file_item.updated_at
+
     def _trim_file(self, store, file_item):
-        """Trim a single .txt file using LLM."""
+        """Trim a single .txt file using LLM. Returns True if the file needs no further trimming."""
+        try:
+            plan = self._plan_trim(file_item)
+            if plan is None:
+                return True
+
+            lines, prompt = plan
+            if prompt is not None:
+                lines = self._llm_trimmed_lines(file_item, self.llm.invoke(prompt).content)
+                if lines is None:
+                    # The LLM kept the file as it is; don't ask again until the file changes
+                    return True
+            store.put(*self._record(file_item, lines))
+            # Re-checked against the stored version on the next run
+            return False
+
+        except Exception as e:
+            print(f"⚠️ Failed to trim {file_item.key}: {e}")
+            return False
+
+    async def _atrim_file(self, store, file_item):
+        """Async variant of _trim_file."""
         try:
-            # Get current content
-            content_lines = file_item.value.get("content", [])
-            current_content = "\n".join(content_lines) if isinstance(content_lines, list) else str(content_lines)
-
-            # Count memories (each bullet point = 1 memory)
-            memory_count = current_content.count("\n- ")
-
-            # Skip if already small enough
-            if memory_count <= self.max_memories:
-                return
-
-            # Format the prompt with runtime values
-            prompt = TRIM_SYSTEM_PROMPT.format(
-                max_memories=self.max_memories,
-                file_key=file_item.key,
-                current_content=current_content
-            )
-
-            response = self.llm.invoke(prompt)
-            trimmed = response.content.strip()
-
-            # Remove markdown code blocks if present (we do not want this)
-            if "```" in trimmed:
-                trimmed = trimmed.replace("```markdown", "").replace("```", "").strip()
-
-            # Save trimmed version
-            store.put(
-                ("filesystem",),
-                file_item.key,
-                {
-                    "content": trimmed.split("\n"),
-                    "created_at": file_item.value.get("created_at", datetime.now().isoformat()),
-                    "modified_at": datetime.now().isoformat(),
-                }
-            )
-
-            print(f"🧹 Trimmed {file_item.key}: {memory_count} → {self.max_memories} memories")
+            plan = self._plan_trim(file_item)
+            if plan is None:
+                return True
+
+            lines, prompt = plan
+            if prompt is not None:
+                lines = self._llm_trimmed_lines(file_item, (await self.llm.ainvoke(prompt)).content)
+                if lines is None:
+                    return True
+            await store.aput(*self._record(file_item, lines))
+            return False
 
         except Exception as e:
             print(f"⚠️ Failed to trim {file_item.key}: {e}")
+            return False
+
+    def _plan_trim(self, file_item):
+        """None if within the limit, else (lines to save, None) or (None, LLM prompt)."""
+        content_lines = self._content_lines(file_item)
+
+        # Count memories (each top-level bullet point = 1 memory)
+        memory_count = sum(1 for line in content_lines if line.startswith("- "))
+
+        # Skip if already small enough, before paying for the join
+        if memory_count <= self.max_memories:
+            return None
+
+        fast_trimmed = self._fast_trim(content_lines)
+        if fast_trimmed is not None:
+            kept_count = sum(1 for line in fast_trimmed if line.startswith("- "))
+            print(f"🧹 Trimmed {file_item.key} without LLM: {memory_count} → {kept_count} memories")
+            return fast_trimmed, None
+
+        # Format the prompt with runtime values
+        prompt = TRIM_SYSTEM_PROMPT.format(
+            max_memories=self.max_memories,
+            file_key=file_item.key,
+            current_content="\n".join(content_lines)
+        )
+        return None, prompt
+
+    def _llm_trimmed_lines(self, file_item, response_content):
+        """Lines to save from the LLM's answer, or None if it kept the file as it was."""
+        # Unwrap a markdown code block if the LLM added one (we do not want this)
+        trimmed = _FENCE_RE.sub("", response_content.strip()).strip()
+
+        content_lines = self._content_lines(file_item)
+        # Nothing to write if the LLM kept the file as it was
+        if trimmed == "\n".join(content_lines).strip():
+            return None
+
+        memory_count = sum(1 for line in content_lines if line.startswith("- "))
+        print(f"🧹 Trimmed {file_item.key}: {memory_count} → {self.max_memories} memories")
+        return trimmed.split("\n")
+
+    def _fast_trim(self, lines):
+        """Drop repeated bullets, keeping the last copy; None if the file is still over the limit."""
+        seen = set()
+        kept = []
+        for line in reversed(lines):
+            if line.startswith("- "):
+                if line in seen:
+                    continue
+                seen.add(line)
+            kept.append(line)
+
+        # Choosing which distinct memories to drop needs the LLM: file position isn't age
+        if len(seen) > self.max_memories:
+            return None
+        kept.reverse()
+        return kept
+
+    @staticmethod
+    def _content_lines(file_item):
+        content = file_item.value.get("content", [])
+        return content if isinstance(content, list) else str(content).split("\n")
+
+    @staticmethod
+    def _record(file_item, lines):
+        """(namespace, key, value) for store.put / store.aput."""
+        return (
+            ("filesystem",),
+            file_item.key,
+            {
+                "content": lines,
+                "created_at": file_item.value.get("created_at", datetime.now().isoformat()),
+                "modified_at": datetime.now().isoformat(),
+            },
+        )
@@ -0,0 +1,71 @@
+"""
+Sub-agent Dispatch Middleware - failure isolation for parallel delegation.
+
+The tool node already fans out every tool call from a single model turn
+(thread pool when invoked sync, asyncio.gather when invoked async), so
+several `task` calls emitted together run concurrently. This middleware makes
+that fan-out safe: at most `max_concurrency` sub-agents run at once, and a
+sub-agent that raises is turned into an error ToolMessage instead of
+cancelling its siblings and aborting the whole run.
+"""
+
+import asyncio
+import threading
+import weakref
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import ToolMessage
+from langgraph.errors import GraphBubbleUp
+
+
+class SubagentDispatchMiddleware(AgentMiddleware):
+    """Caps and isolates parallel `task` calls so sub-agents never cancel each other."""
+
+    def __init__(self, tool_name: str = "task", max_concurrency: int = 4):
+        self.tool_name = tool_name
+        self.max_concurrency = max_concurrency
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        # asyncio semaphores belong to one event loop, so keep one per loop
+        self._async_semaphores = weakref.WeakKeyDictionary()
+
+    def wrap_tool_call(self, request, handler):
+        """Run a sub-agent call, converting failures into an error result."""
+        if request.tool_call["name"] != self.tool_name:
+            return handler(request)
+        try:
+            with self._semaphore:
+                return handler(request)
+        except GraphBubbleUp:
+            raise
+        except Exception as e:
+            return self._error_message(request, e)
+
+    async def awrap_tool_call(self, request, handler):
+        """Async variant used when the supervisor runs under asyncio."""
+        if request.tool_call["name"] != self.tool_name:
+            return await handler(request)
+        try:
+            async with self._async_semaphore():
+                return await handler(request)
+        except GraphBubbleUp:
+            raise
+        except Exception as e:
+            return self._error_message(request, e)
+
+    def _async_semaphore(self):
+        loop = asyncio.get_running_loop()
+        semaphore = self._async_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._async_semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    def _error_message(self, request, error):
+        """Build the ToolMessage the supervisor sees for a failed sub-agent."""
+        subagent = request.tool_call["args"].get("subagent_type", "sub-agent")
+        print(f"⚠️ Sub-agent {subagent} failed: {error}")
+        return ToolMessage(
+            content=f"Error: {subagent} failed ({error}). Retry with a narrower task or continue without it.",
+            tool_call_id=request.tool_call["id"],
+            name=self.tool_name,
+            status="error",
+        )
@@ -0,0 +1,107 @@
+"""
+Tool Cache Middleware - memoizes repeated tool calls within the process.
+
+Identical (tool name, arguments) pairs - the same search query issued twice -
+return the stored result instead of re-running the tool. The cache is shared
+by every run in the server process, so only deterministic, run-independent
+tools belong in it, and entries expire after a TTL so a long-running server
+doesn't serve stale results. Error results and results that update graph
+state (a Command, e.g. from `task`) are never cached.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import ToolMessage
+from langgraph.types import Command
+
+
+def tool_message_from_result(result):
+    """Return the ToolMessage carried by a tool result (plain or inside a Command)."""
+    if isinstance(result, ToolMessage):
+        return result
+    if isinstance(result, Command) and isinstance(result.update, dict):
+        for message in reversed(result.update.get("messages", [])):
+            if isinstance(message, ToolMessage):
+                return message
+    return None
+
+
+class ToolCacheMiddleware(AgentMiddleware):
+    """LRU cache of tool results keyed by a hash of (tool name, arguments), with expiring entries.
+
+    `ttl` is the number of seconds an entry stays fresh, or a callable that
+    returns it for a call's arguments (e.g. a per-topic search TTL).
+    """
+
+    def __init__(self, tool_names=("web_search",), max_entries: int = 512, ttl=3600):
+        self.tool_names = frozenset(tool_names)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def wrap_tool_call(self, request, handler):
+        """Serve cached results, otherwise run the tool and remember its output."""
+        key = self._key(request.tool_call)
+        if key is None:
+            return handler(request)
+
+        cached = self._lookup(key, request.tool_call)
+        if cached is not None:
+            return cached
+
+        result = handler(request)
+        self._store(key, request.tool_call, result)
+        return result
+
+    async def awrap_tool_call(self, request, handler):
+        """Async variant used when the agent runs under asyncio."""
+        key = self._key(request.tool_call)
+        if key is None:
+            return await handler(request)
+
+        cached = self._lookup(key, request.tool_call)
+        if cached is not None:
+            return cached
+
+        result = await handler(request)
+        self._store(key, request.tool_call, result)
+        return result
+
+    def _key(self, tool_call):
+        """Content hash of the normalized call, or None if the tool isn't cached."""
+        if tool_call["name"] not in self.tool_names:
+            return None
+        payload = json.dumps({"tool": tool_call["name"], "args": tool_call["args"]}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key, tool_call):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            content, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+
+        print(f"♻️ Cache hit for {tool_call['name']}, skipped re-running it")
+        return ToolMessage(content=content, tool_call_id=tool_call["id"], name=tool_call["name"])
+
+    def _store(self, key, tool_call, result):
+        # A Command also carries state updates (e.g. files a sub-agent wrote) that a replayed message would drop
+        if not isinstance(result, ToolMessage) or result.status == "error":
+            return
+
+        ttl = self.ttl(tool_call["args"]) if callable(self.ttl) else self.ttl
+        with self._lock:
+            self._entries[key] = (result.content, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
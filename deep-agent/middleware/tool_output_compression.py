@@ -0,0 +1,166 @@
+"""
+Tool Output Compression Middleware - budget-aware compaction of sub-agent results.
+
+Sub-agent answers (especially raw web research) can be long enough to bloat the
+supervisor context well before the framework's ~170k token compaction kicks in.
+Each result is checked against a per-sub-agent token budget before it enters
+supervisor state: cheap rule-based cleanup first, LLM condensing only if the
+result is still over budget. Source URLs are always preserved verbatim.
+"""
+
+import dataclasses
+import re
+import threading
+from functools import lru_cache
+
+from langchain.agents.middleware import AgentMiddleware
+
+from llms import get_llm
+
+from .tool_cache import tool_message_from_result
+
+
+# =============================================================================
+# COMPRESSION PROMPT
+# =============================================================================
+
+COMPRESS_PROMPT = """Condense this sub-agent report to at most {budget} tokens.
+
+Rules:
+- Keep EVERY URL and inline citation exactly as written ([Source](URL) format)
+- Keep all numbers, dates, tickers, plot URLs and verdicts
+- Drop repetition, filler and narrative about the research process
+- Keep the markdown structure (headers, bullet points)
+- Return ONLY the condensed report, no preamble
+
+Report:
+{content}
+"""
+
+DEFAULT_BUDGETS = {
+    "web-research-agent": 4000,
+    "credibility-agent": 4000,
+    "analysis-agent": 2000,
+}
+
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_TRAILING_SPACE_RE = re.compile(r"[ \t]+\n")
+_MIN_FOLD_LENGTH = 20
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    import tiktoken
+
+    return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str) -> int:
+    """Token count for gpt-4o/gpt-5 family models (approximate if tiktoken is unavailable)."""
+    try:
+        return len(_encoding().encode(text, disallowed_special=()))
+    except Exception:
+        return len(text) // 4
+
+
+def _rule_based_compress(text: str) -> str:
+    """Collapse whitespace and fold duplicate content lines, keeping first occurrences."""
+    text = _BLANK_LINES_RE.sub("\n\n", _TRAILING_SPACE_RE.sub("\n", text)).strip()
+    seen = set()
+    kept = []
+    for line in text.split("\n"):
+        stripped = line.strip()
+        # Short lines are structure (headers, table rules, "---"), not content
+        if len(stripped) >= _MIN_FOLD_LENGTH:
+            if stripped in seen:
+                continue
+            seen.add(stripped)
+        kept.append(line)
+    return "\n".join(kept)
+
+
+class ToolOutputCompressionMiddleware(AgentMiddleware):
+    """Keeps sub-agent results under a per-sub-agent token budget."""
+
+    def __init__(
+        self,
+        budgets: dict | None = None,
+        default_budget: int = 4000,
+        tool_name: str = "task",
+        compression_model: str = "gpt-4o-mini",
+    ):
+        self.budgets = DEFAULT_BUDGETS if budgets is None else budgets
+        self.default_budget = default_budget
+        self.tool_name = tool_name
+        self.llm = get_llm(compression_model, temperature=0)
+        # Load the BPE tables now rather than when the first sub-agent result is waiting on them
+        threading.Thread(target=count_tokens, args=("",), name="tiktoken-warmup", daemon=True).start()
+
+    def wrap_tool_call(self, request, handler):
+        """Compress the sub-agent result if it exceeds its budget."""
+        result = handler(request)
+        if request.tool_call["name"] != self.tool_name:
+            return result
+
+        content, budget = self._over_budget(request, result)
+        if content is None:
+            return result
+
+        compressed = _rule_based_compress(content)
+        if count_tokens(compressed) > budget:
+            compressed = self._llm_compress(compressed, budget)
+        return self._replace_content(result, content, compressed)
+
+    async def awrap_tool_call(self, request, handler):
+        """Async variant used when the supervisor runs under asyncio."""
+        result = await handler(request)
+        if request.tool_call["name"] != self.tool_name:
+            return result
+
+        content, budget = self._over_budget(request, result)
+        if content is None:
+            return result
+
+        compressed = _rule_based_compress(content)
+        if count_tokens(compressed) > budget:
+            compressed = await self._allm_compress(compressed, budget)
+        return self._replace_content(result, content, compressed)
+
+    def _over_budget(self, request, result):
+        """Return (content, budget) when the result needs compressing, else (None, budget)."""
+        subagent = request.tool_call["args"].get("subagent_type")
+        budget = self.budgets.get(subagent, self.default_budget)
+
+        message = tool_message_from_result(result)
+        if message is None or message.status == "error" or not isinstance(message.content, str):
+            return None, budget
+        if count_tokens(message.content) <= budget:
+            return None, budget
+        return message.content, budget
+
+    def _llm_compress(self, content, budget):
+        try:
+            response = self.llm.invoke(COMPRESS_PROMPT.format(budget=budget, content=content))
+            return response.content.strip()
+        except Exception as e:
+            print(f"⚠️ Tool output compression failed: {e}")
+            return content
+
+    async def _allm_compress(self, content, budget):
+        try:
+            response = await self.llm.ainvoke(COMPRESS_PROMPT.format(budget=budget, content=content))
+            return response.content.strip()
+        except Exception as e:
+            print(f"⚠️ Tool output compression failed: {e}")
+            return content
+
+    def _replace_content(self, result, original, compressed):
+        """Swap the ToolMessage content inside a plain or Command result."""
+        print(f"🗜️ Compressed sub-agent result: {count_tokens(original)} → {count_tokens(compressed)} tokens")
+        message = tool_message_from_result(result)
+        new_message = message.model_copy(update={"content": compressed})
+        if result is message:
+            return new_message
+
+        messages = [new_message if m is message else m for m in result.update["messages"]]
+        return dataclasses.replace(result, update={**result.update, "messages": messages})
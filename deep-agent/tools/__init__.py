@@ -1,6 +1,7 @@
 """Tools for the research agent system."""
 
 from .code_execution import execute_python_code
-from .web_search import web_search
+from .memory import read_memories
+from .web_search import search_cache_ttl, web_search, web_search_batch
 
-__all__ = ["execute_python_code", "web_search"]
+__all__ = ["execute_python_code", "read_memories", "search_cache_ttl", "web_search", "web_search_batch"]
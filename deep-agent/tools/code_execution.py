@@ -4,30 +4,112 @@ Code execution tool using Daytona sandbox.
 Provides safe Python code execution with data science libraries. Plot outputs
 are pulled from the sandbox and uploaded from the host to Cloudinary when
 environment variables are configured.
+
+Sandboxes are pooled: creating one takes seconds while a code run takes a
+single round trip, so finished sandboxes are kept warm for the next call
+instead of being deleted.
 """
 
 from __future__ import annotations
 
+import atexit
+import hashlib
 import json
 import os
-import shutil
-import tempfile
+import queue
+import re
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict, Iterable, List, Tuple
 from uuid import uuid4
 
 import requests
 from daytona_sdk import Daytona
+from requests.adapters import HTTPAdapter
+from requests_toolbelt.multipart.encoder import MultipartEncoder
+from urllib3.util.retry import Retry
+
+
+@lru_cache(maxsize=1)
+def get_daytona() -> Daytona:
+    """Shared Daytona client, created on first use so importing the tools needs no Daytona credentials."""
+    return Daytona()
+
+
+# Prepended to every run so the common libraries are already imported
+SETUP_CODE = """
+import pandas as pd
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import seaborn as sns
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+import os
+os.makedirs('/home/daytona/outputs', exist_ok=True)
+import atexit as _atexit, json as _json
+# Report the generated files on exit (even after an error) so the host can skip listing them;
+# names are bound as defaults so user code rebinding os/json can't break the report
+_atexit.register(lambda os=os, json=_json: print("\\n__OUTPUT_FILES__=" + json.dumps(
+    [e.name for e in os.scandir('/home/daytona/outputs') if e.is_file()] if os.path.isdir('/home/daytona/outputs') else []
+)))
+"""
+
+# Runs the user's code as its own compiled unit after the setup: a syntax error can't skip the setup,
+# `from __future__` imports still work, and tracebacks show the user's own line numbers
+USER_CODE_RUNNER = """
+import linecache as _linecache, sys as _sys, traceback as _traceback
+_linecache.cache['<code>'] = (len(_USER_CODE), None, _USER_CODE.splitlines(True), '<code>')
+try:
+    exec(compile(_USER_CODE, '<code>', 'exec'))
+except SystemExit:
+    raise
+except BaseException as _exc:
+    # Drop this runner's frame so the traceback starts in the user's code
+    _traceback.print_exception(type(_exc), _exc, _exc.__traceback__.tb_next)
+    _sys.exit(1)
+"""
+
+_OUTPUT_FILES_RE = re.compile(r"\n*__OUTPUT_FILES__=(\[.*\])\s*$")
+
+# Empties the outputs dir so the next run on a pooled sandbox only sees its own plots
+RESET_OUTPUTS_CODE = "import shutil; shutil.rmtree('/home/daytona/outputs', ignore_errors=True)"
+
+# Concurrent plot downloads per call; each is an independent round trip
+MAX_PARALLEL_DOWNLOADS = 8
+# Concurrent Cloudinary uploads per call, sharing the pooled session's connections
+MAX_PARALLEL_UPLOADS = 8
+
+# Shared session, so uploads reuse keep-alive connections instead of a TLS handshake per file.
+# Retries only cover failed connects: POST isn't an idempotent method, so a sent upload is never repeated
+_cloudinary_session = requests.Session()
+_cloudinary_session.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=MAX_PARALLEL_UPLOADS,
+        max_retries=Retry(total=2, backoff_factor=0.2),
+    ),
+)
 
-daytona = Daytona()
+# Warm sandboxes kept between calls; 0 disables pooling
+SANDBOX_POOL_SIZE = int(os.getenv("DAYTONA_SANDBOX_POOL_SIZE", "2"))
+# Daytona auto-stops idle sandboxes, so older pooled ones are deleted instead of reused
+SANDBOX_MAX_IDLE_SECONDS = 600
+
+# Most recently released first, so the stalest sandboxes are the ones left to expire
+_idle_sandboxes: queue.LifoQueue = queue.LifoQueue(maxsize=max(SANDBOX_POOL_SIZE, 1))
 
 # Get absolute paths
 _TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
 _DEEP_AGENT_DIR = os.path.dirname(_TOOLS_DIR)
 
 
-def _cloudinary_config() -> Tuple[Dict[str, str], List[str]]:
-    """Read Cloudinary env config and return settings + warnings."""
+@lru_cache(maxsize=1)
+def _cloudinary_config() -> Tuple[Dict[str, str], Tuple[str, ...]]:
+    """Read Cloudinary env config once per process and return settings + warnings (callers must not mutate)."""
     warnings: List[str] = []
 
     cloud_name = os.getenv("CLOUDINARY_CLOUD_NAME")
@@ -65,59 +147,145 @@ def _cloudinary_config() -> Tuple[Dict[str, str], List[str]]:
         "prefix": prefix,
     }
     if warnings:
-        return {}, warnings
-    return cfg, warnings
+        return {}, tuple(warnings)
+    return cfg, ()
 
 
-def _upload_cloudinary_host(file_paths: Iterable[str]) -> Tuple[List[str], List[str]]:
-    """Upload plot files from host to Cloudinary (used when sandbox egress is blocked)."""
-    cfg, warnings = _cloudinary_config()
+def _upload_cloudinary_host(files: Iterable[Tuple[str, bytes]]) -> Tuple[List[str], List[str]]:
+    """Upload (file name, content) plots from host to Cloudinary (used when sandbox egress is blocked)."""
+    cfg, cfg_warnings = _cloudinary_config()
+    warnings = list(cfg_warnings)
     if not cfg:
         return [], warnings
 
     upload_url = f"https://api.cloudinary.com/v1_1/{cfg['cloud_name']}/image/upload"
-    uploaded: List[str] = []
-
-    for path in file_paths:
-        base = os.path.basename(path)
-        stem, _ = os.path.splitext(base)
-        public_id = f"{cfg['prefix'].rstrip('/')}/{uuid4().hex}_{stem}".lstrip("/")
-        timestamp = int(time.time())
-        data: Dict[str, str] = {
-            "api_key": cfg["api_key"],
-            "timestamp": str(timestamp),
-            "public_id": public_id,
-        }
-        if cfg["upload_preset"]:
-            data["upload_preset"] = cfg["upload_preset"]
-        elif cfg["api_secret"]:
-            to_sign = f"public_id={public_id}&timestamp={timestamp}{cfg['api_secret']}"
-            import hashlib
-
-            data["signature"] = hashlib.sha1(to_sign.encode("utf-8")).hexdigest()
-        else:
-            warnings.append("Missing both CLOUDINARY_API_SECRET and CLOUDINARY_UPLOAD_PRESET; cannot upload.")
-            continue
+    files = list(files)
+    if not files:
+        return [], warnings
 
+    # Uploads are independent round trips, so overlap them; results keep the input order
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_UPLOADS, len(files))) as pool:
+        results = list(pool.map(lambda file: _upload_one(upload_url, cfg, *file), files))
+
+    uploaded = [url for url, _ in results if url]
+    warnings.extend(warning for _, warning in results if warning)
+    return uploaded, warnings
+
+
+def _upload_one(upload_url: str, cfg: Dict[str, str], name: str, content: bytes) -> Tuple[str | None, str | None]:
+    """Upload a single file; returns (url, None) on success or (None, warning)."""
+    stem, _ = os.path.splitext(name)
+    public_id = f"{cfg['prefix'].rstrip('/')}/{uuid4().hex}_{stem}".lstrip("/")
+    timestamp = int(time.time())
+    data: Dict[str, str] = {
+        "api_key": cfg["api_key"],
+        "timestamp": str(timestamp),
+        "public_id": public_id,
+    }
+    if cfg["upload_preset"]:
+        data["upload_preset"] = cfg["upload_preset"]
+    elif cfg["api_secret"]:
+        to_sign = f"public_id={public_id}&timestamp={timestamp}{cfg['api_secret']}"
+        data["signature"] = hashlib.sha1(to_sign.encode("utf-8")).hexdigest()
+    else:
+        return None, "Missing both CLOUDINARY_API_SECRET and CLOUDINARY_UPLOAD_PRESET; cannot upload."
+
+    try:
+        # Streamed in chunks, so the multipart body isn't a second in-memory copy of the plot
+        body = MultipartEncoder(fields={**data, "file": (name, content)})
+        resp = _cloudinary_session.post(upload_url, data=body, headers={"Content-Type": body.content_type}, timeout=30)
+        if resp.status_code >= 400:
+            return None, f"Host upload failed for {name}: {resp.status_code} {resp.text}"
+        if resp.headers.get("Content-Type", "").startswith("application/json"):
+            body = resp.json()
+            url = body.get("secure_url") or body.get("url")
+            if url:
+                return url, None
+            return None, f"Host upload returned no URL for {name}"
+        return None, f"Host upload returned non-JSON response for {name}"
+    except Exception as exc:
+        return None, f"Host upload error for {name}: {exc}"
+
+
+def _acquire_sandbox():
+    """Reuse a warm pooled sandbox, or create one if none is fresh enough."""
+    while True:
         try:
-            with open(path, "rb") as f:
-                resp = requests.post(upload_url, data=data, files={"file": f}, timeout=30)
-            if resp.status_code >= 400:
-                warnings.append(f"Host upload failed for {path}: {resp.status_code} {resp.text}")
-                continue
-            if resp.headers.get("Content-Type", "").startswith("application/json"):
-                body = resp.json()
-                url = body.get("secure_url") or body.get("url")
-                if url:
-                    uploaded.append(url)
-                else:
-                    warnings.append(f"Host upload returned no URL for {path}")
-            else:
-                warnings.append(f"Host upload returned non-JSON response for {path}")
+            sandbox, released_at = _idle_sandboxes.get_nowait()
+        except queue.Empty:
+            return get_daytona().create()
+        if time.monotonic() - released_at < SANDBOX_MAX_IDLE_SECONDS:
+            return sandbox
+        _delete_sandbox(sandbox)
+
+
+def _release_sandbox(sandbox, reusable: bool) -> None:
+    """Return a healthy sandbox to the pool; delete it if it is broken or the pool is full."""
+    if reusable and SANDBOX_POOL_SIZE > 0:
+        try:
+            _idle_sandboxes.put_nowait((sandbox, time.monotonic()))
+            return
+        except queue.Full:
+            pass
+    _delete_sandbox(sandbox)
+
+
+def _delete_sandbox(sandbox) -> None:
+    try:
+        get_daytona().delete(sandbox)
+    except Exception as exc:
+        print(f"⚠️ Failed to delete Daytona sandbox: {exc}")
+
+
+@atexit.register
+def _drain_sandbox_pool() -> None:
+    """Delete pooled sandboxes on shutdown so none are left running."""
+    while True:
+        try:
+            sandbox, _ = _idle_sandboxes.get_nowait()
+        except queue.Empty:
+            return
+        _delete_sandbox(sandbox)
+
+
+def _build_run_code(code: str) -> str:
+    """Setup, then the user's code embedded as a string literal and run by USER_CODE_RUNNER."""
+    return f"{SETUP_CODE}\n_USER_CODE = {code!r}\n{USER_CODE_RUNNER}"
+
+
+def _split_output_files(result):
+    """Strip the exit report from the run output; returns (output, file names or None if missing)."""
+    match = _OUTPUT_FILES_RE.search(result or "")
+    if match is None:
+        return result, None
+    try:
+        names = json.loads(match.group(1))
+    except ValueError:
+        return result, None
+    return result[:match.start()], names
+
+
+def _upload_output_files(sandbox, file_names: List[str]) -> List[str]:
+    """Download the run's output files and upload them to Cloudinary; returns the output sections to report."""
+    output_parts: List[str] = []
+    downloaded: List[Tuple[str, bytes]] = []
+
+    # Fetched straight into memory: the host only forwards the plots, so they never touch its disk
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_DOWNLOADS, len(file_names))) as pool:
+        futures = [pool.submit(sandbox.fs.download_file, f"/home/daytona/outputs/{name}") for name in file_names]
+    for name, future in zip(file_names, futures):
+        try:
+            downloaded.append((name, future.result()))
         except Exception as exc:
-            warnings.append(f"Host upload error for {path}: {exc}")
+            output_parts.append(f"Plot upload warnings: host download failed for {name}: {exc}")
 
-    return uploaded, warnings
+    if downloaded:
+        urls, warns = _upload_cloudinary_host(downloaded)
+        if urls:
+            output_parts.append("Plot URLs:\n" + "\n".join(f"- {url}" for url in urls))
+        if warns:
+            output_parts.append("Plot upload warnings:\n" + "\n".join(f"- {w}" for w in warns))
+    return output_parts
 
 
 def execute_python_code(code: str) -> str:
@@ -135,65 +303,50 @@ def execute_python_code(code: str) -> str:
     Returns:
         Execution output, generated file paths, and public URLs when available
     """
-    # Create a sandbox
-    sandbox = daytona.create()
+    sandbox = _acquire_sandbox()
+    reusable = False
 
     try:
-        # Setup code with common imports
-        setup = """
-import pandas as pd
-import numpy as np
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
-from sklearn.linear_model import LinearRegression
-import os
-os.makedirs('/home/daytona/outputs', exist_ok=True)
-"""
-        # Run setup first (ensures outputs dir exists even if user code has syntax errors)
-        sandbox.process.code_run(setup)
-
-        # Run user code
-        response = sandbox.process.code_run(code)
+        # Setup and user code in one run, so the imports are available to the code
+        response = sandbox.process.code_run(_build_run_code(code))
 
         output_parts = []
+        # Assume leftovers until the listing proves the outputs dir is empty
+        has_outputs = True
 
         # If the code does print("hello") → that goes into response.result
-        if response.result:
-            output_parts.append(f"Output:\n{response.result}")
+        result, file_names = _split_output_files(response.result)
+        if result:
+            output_parts.append(f"Output:\n{result}")
 
         # Check for generated files, download them, and upload from host
         try:
-            files = sandbox.fs.list_files("/home/daytona/outputs")
-            if files:
-                file_names = [f.name if hasattr(f, "name") else str(f) for f in files]
+            # Only list the dir when the run died before reporting its files
+            if file_names is None:
+                files = sandbox.fs.list_files("/home/daytona/outputs")
+                file_names = [getattr(f, "name", None) or str(f) for f in files]
+            has_outputs = bool(file_names)
+            if file_names:
                 output_parts.append("Generated files:\n" + "\n".join(f"- {name}" for name in file_names))
-                temp_dir = tempfile.mkdtemp(prefix="plots_")
-                downloaded: List[str] = []
-                for name in file_names:
-                    remote_path = f"/home/daytona/outputs/{name}"
-                    local_path = os.path.join(temp_dir, name)
-                    try:
-                        sandbox.fs.download_file(remote_path, local_path)
-                        downloaded.append(local_path)
-                    except Exception as exc:
-                        output_parts.append(f"Plot upload warnings: host download failed for {name}: {exc}")
-
-                if downloaded:
-                    urls, warns = _upload_cloudinary_host(downloaded)
-                    if urls:
-                        output_parts.append("Plot URLs:\n" + "\n".join(f"- {url}" for url in urls))
-                    if warns:
-                        output_parts.append("Plot upload warnings:\n" + "\n".join(f"- {w}" for w in warns))
-                shutil.rmtree(temp_dir, ignore_errors=True)
+                cfg, cfg_warnings = _cloudinary_config()
+                if cfg:
+                    output_parts.extend(_upload_output_files(sandbox, file_names))
+                else:
+                    # Without credentials nothing can be uploaded, so don't pull the files off the sandbox at all
+                    output_parts.append("Plot upload warnings:\n" + "\n".join(f"- {w}" for w in cfg_warnings))
             else:
                 output_parts.append("No plot files found to upload.")
         except Exception as exc:
             output_parts.append(f"Plot upload warnings: {exc}")
 
+        try:
+            if has_outputs:
+                sandbox.process.code_run(RESET_OUTPUTS_CODE)
+            reusable = True
+        except Exception as exc:
+            print(f"⚠️ Could not reset Daytona sandbox, discarding it: {exc}")
+
         return "\n\n".join(output_parts) if output_parts else "Code executed successfully"
 
     finally:
-        daytona.delete(sandbox)
+        _release_sandbox(sandbox, reusable)
@@ -0,0 +1,45 @@
+"""
+Memory tool - read the long-term memory files in one call.
+
+Agents read their /memories/ files before complex tasks. With read_file that
+is one tool call per file, each costing a model round trip and a slot of the
+sub-agent tool budget; read_memories returns all of them at once.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain.tools import ToolRuntime
+
+from middleware.memory_backend import make_backend
+
+MEMORY_FILES = (
+    "/memories/website_quality.txt",
+    "/memories/research_lessons.txt",
+    "/memories/source_notes.txt",
+    "/memories/coding.txt",
+)
+
+# Concurrent store reads per call; the path list comes from the model, so it isn't trusted to be small
+MAX_PARALLEL_READS = 4
+
+
+def read_memories(runtime: ToolRuntime, files: list[str] | None = None) -> str:
+    """
+    Read several long-term memory files in one call.
+
+    Args:
+        files: /memories/ file paths to read (default: all memory files)
+
+    Returns:
+        Each file's contents under a "## <path>" header
+    """
+    # Repeated paths are read once
+    paths = list(dict.fromkeys(path for path in (files or MEMORY_FILES) if path.startswith("/memories/")))
+    if not paths:
+        return "Error: read_memories only reads files under /memories/"
+
+    # Routed through the same backend as read_file, so /memories/ hits the shared store
+    backend = make_backend(runtime)
+    with ThreadPoolExecutor(max_workers=min(len(paths), MAX_PARALLEL_READS)) as pool:
+        contents = list(pool.map(backend.read, paths))
+    return "\n\n".join(f"## {path}\n{content}" for path, content in zip(paths, contents))
@@ -0,0 +1,59 @@
+"""
+Search cache - persistent TTL cache for web search results.
+
+Reports are often re-run while iterating on a prompt, and the supervisor and
+sub-agents frequently ask the same question about the same ticker. Results
+are stored as JSON files keyed by a hash of the call arguments, so repeated
+searches survive process restarts and skip the Tavily round trip (and its
+cost) until they expire.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+
+class FileCache:
+    """JSON-file cache keyed by a hash of the call arguments. Best effort: I/O errors are cache misses."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory) if directory else None
+
+    def get(self, args: dict, ttl: float):
+        """Return the stored payload if it is younger than `ttl` seconds, else None."""
+        if self.directory is None:
+            return None
+        try:
+            entry = json.loads(self._path(args).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("ts", 0) > ttl:
+            return None
+        return entry.get("payload")
+
+    def set(self, args: dict, payload) -> None:
+        """Store the payload, replacing the file atomically so readers never see partial JSON."""
+        if self.directory is None:
+            return
+        tmp_path = None
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"ts": time.time(), "args": args, "payload": payload}, f)
+            os.replace(tmp_path, self._path(args))
+            tmp_path = None
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠️ Search cache write failed: {e}")
+        finally:
+            if tmp_path is not None:
+                with contextlib.suppress(OSError):
+                    os.unlink(tmp_path)
+
+    def _path(self, args):
+        key = hashlib.sha256(json.dumps(args, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        return self.directory / f"{key}.json"
@@ -5,14 +5,44 @@ Provides web search capabilities for research and information gathering.
 """
 
 import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Literal
 from dotenv import load_dotenv
 from tavily import TavilyClient
+from tavily.errors import UsageLimitExceededError
+
+from .search_cache import FileCache
 
 load_dotenv()
 
 tavily_client = TavilyClient(api_key=os.environ["TAVILY_API_KEY"])
 
+# Persistent result cache; set WEB_SEARCH_CACHE_DIR="" to disable
+search_cache = FileCache(os.getenv("WEB_SEARCH_CACHE_DIR", ".cache/web_search"))
+
+# Seconds a cached result stays fresh, by topic: news moves fast, background facts don't
+SEARCH_CACHE_TTLS = {"general": 24 * 3600, "news": 3600, "finance": 3600}
+
+# Concurrent Tavily requests across every agent; parallel sub-agents otherwise burst into 429s
+MAX_CONCURRENT_SEARCHES = 8
+MAX_RATE_LIMIT_RETRIES = 3
+_search_slots = threading.BoundedSemaphore(MAX_CONCURRENT_SEARCHES)
+
+def search_cache_ttl(args: dict) -> float:
+    """Seconds a result for these web_search arguments stays fresh (also used by ToolCacheMiddleware)."""
+    return SEARCH_CACHE_TTLS.get(args.get("topic", "general"), 3600)
+
+
+def normalize_query(query: str) -> str:
+    """Cache key form of a query: only case and runs of whitespace are ignored.
+
+    Word order and symbols stay, since they change the meaning ("EUR to USD" vs "USD to EUR", "C#" vs "C++").
+    """
+    return " ".join(query.casefold().split())
+
 
 def web_search(
     query: str,
@@ -30,4 +60,62 @@ def web_search(
     Returns:
         Search results with URLs, content, and metadata
     """
-    return tavily_client.search(query, max_results=max_results, topic=topic)
+    args = {"query": normalize_query(query), "max_results": max_results, "topic": topic}
+    cached = search_cache.get(args, ttl=search_cache_ttl(args))
+    if cached is not None:
+        return cached
+
+    results = _search_with_backoff(query, max_results=max_results, topic=topic)
+    search_cache.set(args, results)
+    return results
+
+
+def web_search_batch(
+    queries: list[str],
+    max_results: int = 5,
+    topic: Literal["general", "news", "finance"] = "general"
+) -> dict:
+    """
+    Run several web searches concurrently as a single tool call.
+
+    Use this instead of separate web_search calls when you have 2+ queries planned.
+
+    Args:
+        queries: Search query strings (one focused query each)
+        max_results: Max results per query (default 5)
+        topic: 'general', 'news', or 'finance' (applies to every query)
+
+    Returns:
+        Mapping of each query to its search results, or to {"error": ...} if that search failed
+    """
+    # Only exact repeats (ignoring case and whitespace) are collapsed; reworded queries all run
+    by_key = {}
+    for query in queries:
+        by_key.setdefault(normalize_query(query), query)
+    unique = list(by_key.values())
+    if not unique:
+        return {}
+
+    def search(query):
+        try:
+            return web_search(query, max_results=max_results, topic=topic)
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    with ThreadPoolExecutor(max_workers=min(len(unique), MAX_CONCURRENT_SEARCHES)) as pool:
+        return dict(zip(unique, pool.map(search, unique)))
+
+
+def _search_with_backoff(query, max_results, topic):
+    """Tavily search under the shared concurrency cap, backing off exponentially on 429s."""
+    for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+        try:
+            with _search_slots:
+                return tavily_client.search(query, max_results=max_results, topic=topic)
+        except UsageLimitExceededError:
+            if attempt == MAX_RATE_LIMIT_RETRIES:
+                raise
+            # Sleep outside the semaphore so waiting doesn't hold a slot
+            delay = min(60, 2 ** attempt + random.random())
+            print(f"⚠️ Tavily rate limit hit, retrying in {delay:.1f}s")
+            time.sleep(delay)
@@ -21,6 +21,8 @@ def set_test_environment():
     os.environ.setdefault("TAVILY_API_KEY", "test_tavily_key")
     os.environ.setdefault("DAYTONA_API_KEY", "test_daytona_key")
     os.environ.setdefault("OPENAI_API_KEY", "test_openai_key")
+    # Tests must never read or write the on-disk web search cache
+    os.environ.setdefault("WEB_SEARCH_CACHE_DIR", "")
 
     yield
 
@@ -68,20 +70,16 @@ def mock_agent_state():
 # SKIP MARKERS
 # =============================================================================
 
+MARKERS = (
+    "unit: Unit tests (fast, no external dependencies)",
+    "integration: Integration tests (may call external services)",
+    "slow: Slow running tests",
+    "requires_db: Tests that require PostgreSQL database",
+    "requires_api: Tests that require external API keys",
+)
+
+
 def pytest_configure(config):
     """Configure custom markers."""
-    config.addinivalue_line(
-        "markers", "unit: Unit tests (fast, no external dependencies)"
-    )
-    config.addinivalue_line(
-        "markers", "integration: Integration tests (may call external services)"
-    )
-    config.addinivalue_line(
-        "markers", "slow: Slow running tests"
-    )
-    config.addinivalue_line(
-        "markers", "requires_db: Tests that require PostgreSQL database"
-    )
-    config.addinivalue_line(
-        "markers", "requires_api: Tests that require external API keys"
-    )
+    for marker in MARKERS:
+        config.addinivalue_line("markers", marker)
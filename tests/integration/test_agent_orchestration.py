@@ -48,13 +48,57 @@ def test_main_agent_graph_configured_with_recursion_limit():
     main_agent, mock_deep_agent, mock_configured, patchers = _reload_with_patches()
 
     try:
-        # Verify with_config was called with recursion_limit (may be called multiple times due to module reloading)
-        assert mock_deep_agent.with_config.call_count >= 1
-        mock_deep_agent.with_config.assert_called_with({"recursion_limit": 1000})
-        # The main_agent_graph should be the configured agent
-        assert main_agent.main_agent_graph is mock_configured
+        # Nothing is built until the factory is first called
+        mock_deep_agent.with_config.assert_not_called()
+
+        graph = main_agent.get_main_agent_graph()
+        mock_deep_agent.with_config.assert_called_once_with({"recursion_limit": 400})
+        # The factory returns the configured agent
+        assert graph is mock_configured
         # Verify we have 3 subagents defined
-        assert len(main_agent.subagents) == 3
+        assert len(main_agent.build_subagents()) == 3
+    finally:
+        for patcher in patchers:
+            patcher.stop()
+
+
+@pytest.mark.integration
+def test_main_agent_graph_is_built_once():
+    main_agent, mock_deep_agent, mock_configured, patchers = _reload_with_patches()
+
+    try:
+        assert main_agent.get_main_agent_graph() is main_agent.get_main_agent_graph()
+        assert mock_deep_agent.with_config.call_count == 1
+    finally:
+        for patcher in patchers:
+            patcher.stop()
+
+
+@pytest.mark.integration
+def test_main_agent_graph_alias_resolves_to_built_graph():
+    main_agent, mock_deep_agent, mock_configured, patchers = _reload_with_patches()
+
+    try:
+        from agents import main_agent_graph
+
+        assert main_agent_graph is main_agent.get_main_agent_graph() is mock_configured
+    finally:
+        for patcher in patchers:
+            patcher.stop()
+
+
+@pytest.mark.integration
+def test_main_agent_prompt_uses_shared_memory_rules():
+    main_agent, mock_deep_agent, mock_configured, patchers = _reload_with_patches()
+
+    try:
+        from agents.prompt_fragments import MEMORY_FILES_RULE, MEMORY_WRITING_FORMAT
+
+        assert MEMORY_FILES_RULE in main_agent.SYSTEM_PROMPT
+        assert MEMORY_WRITING_FORMAT in main_agent.SYSTEM_PROMPT
+        # The prompt is static; the run's time is appended by CurrentTimeMiddleware
+        assert "current_date_time" not in main_agent.SYSTEM_PROMPT
+        assert "\n\n\n" not in main_agent.SYSTEM_PROMPT
     finally:
         for patcher in patchers:
             patcher.stop()
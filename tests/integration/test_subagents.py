@@ -2,6 +2,7 @@
 
 import importlib
 import sys
+from typing import get_args
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -52,12 +53,15 @@ def test_subagent_entries_have_expected_shape():
     main_agent, subagent_graphs, patchers = _load_main_agent_with_stubs()
 
     try:
-        assert len(main_agent.subagents) == 3
-        names = {s["name"] for s in main_agent.subagents}
+        subagents = main_agent.build_subagents()
+        assert len(subagents) == 3
+        names = {s["name"] for s in subagents}
         assert names == {"analysis-agent", "web-research-agent", "credibility-agent"}
 
-        for sub in main_agent.subagents:
+        for sub in subagents:
             assert sub["description"]
+            # Descriptions are serialized into every supervisor call, so no layout whitespace
+            assert sub["description"] == " ".join(sub["description"].split())
             assert "runnable" in sub
     finally:
         for patcher in patchers:
@@ -69,9 +73,37 @@ def test_subagent_runnables_are_unique():
     main_agent, subagent_graphs, patchers = _load_main_agent_with_stubs()
 
     try:
-        runnable_ids = {id(sub["runnable"]) for sub in main_agent.subagents}
+        runnable_ids = {id(sub["runnable"]) for sub in main_agent.build_subagents()}
         # Each subagent should have a unique runnable
         assert len(runnable_ids) == 3
     finally:
         for patcher in patchers:
             patcher.stop()
+
+
+@pytest.mark.integration
+def test_subagent_names_match_literal_type():
+    main_agent, subagent_graphs, patchers = _load_main_agent_with_stubs()
+
+    try:
+        names = [sub["name"] for sub in main_agent.build_subagents()]
+        assert names == list(get_args(main_agent.SubagentName))
+        assert list(main_agent.SUBAGENTS_BY_NAME) == names
+    finally:
+        for patcher in patchers:
+            patcher.stop()
+
+
+@pytest.mark.integration
+def test_subagent_prompts_are_static_and_compact():
+    main_agent, subagent_graphs, patchers = _load_main_agent_with_stubs()
+
+    try:
+        for spec in main_agent.SUBAGENTS:
+            prompt = importlib.import_module(spec.module).PROMPT
+            # The run's time is appended by CurrentTimeMiddleware, not baked in at import
+            assert "current_date_time" not in prompt
+            assert "\n\n\n" not in prompt
+    finally:
+        for patcher in patchers:
+            patcher.stop()
@@ -1,6 +1,6 @@
 """Unit tests for memory backend and cleanup middleware."""
 
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, PropertyMock, patch
 
 import pytest
 
@@ -35,7 +35,20 @@ class TestMemoryCleanupMiddleware:
 
         middleware.after_agent(state={}, runtime=MagicMock())
 
-        store.search.assert_called_once_with(("filesystem",))
+        store.search.assert_called_once_with(("filesystem",), limit=100, offset=0)
+
+    def test_pages_through_large_namespaces(self):
+        from middleware.memory_cleanup import SEARCH_PAGE_SIZE, iter_memory_files
+
+        scratch = MagicMock()
+        scratch.key = "/scratchpad/notes/a.md"
+        memory = MagicMock()
+        memory.key = "/memories/late.txt"
+        store = MagicMock()
+        store.search.side_effect = [[scratch] * SEARCH_PAGE_SIZE, [memory]]
+
+        assert list(iter_memory_files(store)) == [memory]
+        assert store.search.call_args_list[1].kwargs == {"limit": SEARCH_PAGE_SIZE, "offset": SEARCH_PAGE_SIZE}
 
     def test_skips_small_files(self):
         from middleware.memory_cleanup import MemoryCleanupMiddleware
@@ -64,7 +77,7 @@ class TestMemoryCleanupMiddleware:
         trimmed_response = MagicMock()
         trimmed_response.content = "## Test\n- Trimmed 1\n- Trimmed 2"
 
-        with patch("middleware.memory_cleanup.ChatOpenAI") as mock_chat:
+        with patch("middleware.memory_cleanup.get_llm") as mock_chat:
             llm = MagicMock()
             llm.invoke.return_value = trimmed_response
             mock_chat.return_value = llm
@@ -77,6 +90,151 @@ class TestMemoryCleanupMiddleware:
         assert args[1] == "/memories/test.txt"
         assert "- Trimmed 1" in "\n".join(args[2]["content"])
 
+    def test_skips_write_when_llm_returns_file_unchanged(self):
+        from middleware.memory_cleanup import MemoryCleanupMiddleware
+
+        store = MagicMock()
+        item = MagicMock()
+        item.key = "/memories/test.txt"
+        content = "\n".join(f"- Memory {i}" for i in range(4))
+        item.value = {"content": content.split("\n")}
+        store.search.return_value = [item]
+
+        with patch("middleware.memory_cleanup.get_llm") as mock_chat:
+            mock_chat.return_value.invoke.return_value = MagicMock(content=content)
+            middleware = MemoryCleanupMiddleware(store, max_memories_per_file=3)
+            middleware.after_agent(state={}, runtime=MagicMock())
+
+        # The first-line bullet counts, so the file is over the limit and gets sent to the LLM
+        mock_chat.return_value.invoke.assert_called_once()
+        store.put.assert_not_called()
+
+    def test_trims_every_oversized_file(self):
+        from middleware.memory_cleanup import MemoryCleanupMiddleware
+
+        store = MagicMock()
+        items = []
+        for name in ("a", "b", "c"):
+            item = MagicMock()
+            item.key = f"/memories/{name}.txt"
+            item.value = {"content": [f"- {name} {i}" for i in range(5)]}
+            items.append(item)
+        store.search.return_value = items
+
+        with patch("middleware.memory_cleanup.get_llm") as mock_chat:
+            mock_chat.return_value.invoke.return_value = MagicMock(content="- kept")
+            middleware = MemoryCleanupMiddleware(store, max_memories_per_file=3)
+            middleware.after_agent(state={}, runtime=MagicMock())
+
+        assert mock_chat.return_value.invoke.call_count == 3
+        assert sorted(call.args[1] for call in store.put.call_args_list) == [item.key for item in items]
+
+    def test_duplicates_are_dropped_without_llm_keeping_last_copy(self):
+        from middleware.memory_cleanup import MemoryCleanupMiddleware
+
+        store = MagicMock()
+        duplicated = MagicMock()
+        duplicated.key = "/memories/dupes.txt"
+        duplicated.value = {"content": ["## Sources", "- a", "- b", "- a", "- c", "- b", "- a"]}
+        distinct_over = MagicMock()
+        distinct_over.key = "/memories/over.txt"
+        distinct_over.value = {"content": ["## Lessons", "- old", "- b", "## Tools", "- c", "- d", "- e"]}
+        store.search.return_value = [duplicated, distinct_over]
+
+        with patch("middleware.memory_cleanup.get_llm") as mock_chat:
+            mock_chat.return_value.invoke.return_value = MagicMock(content="## Lessons\n- b\n## Tools\n- c\n- d\n- e")
+            middleware = MemoryCleanupMiddleware(store, max_memories_per_file=4)
+            middleware.after_agent(state={}, runtime=MagicMock())
+
+        # Dedup alone brings dupes.txt under the cap; over.txt has 5 distinct memories, so the LLM picks
+        mock_chat.return_value.invoke.assert_called_once()
+        assert "/memories/over.txt" in str(mock_chat.return_value.invoke.call_args)
+        saved = {call.args[1]: call.args[2]["content"] for call in store.put.call_args_list}
+        assert saved == {
+            "/memories/dupes.txt": ["## Sources", "- c", "- b", "- a"],
+            "/memories/over.txt": ["## Lessons", "- b", "## Tools", "- c", "- d", "- e"],
+        }
+
+    async def test_async_cleanup_uses_async_store_and_llm(self):
+        from middleware.memory_cleanup import MemoryCleanupMiddleware
+
+        store = MagicMock()
+        item = MagicMock()
+        item.key = "/memories/test.txt"
+        item.value = {"content": [f"- Memory {i}" for i in range(10)]}
+        store.asearch = AsyncMock(return_value=[item])
+        store.aput = AsyncMock()
+
+        with patch("middleware.memory_cleanup.get_llm") as mock_chat:
+            mock_chat.return_value.ainvoke = AsyncMock(return_value=MagicMock(content="- Memory 1\n- Memory 2"))
+            middleware = MemoryCleanupMiddleware(store, max_memories_per_file=3)
+            await middleware.aafter_agent(state={}, runtime=MagicMock())
+
+        store.search.assert_not_called()
+        store.put.assert_not_called()
+        store.aput.assert_awaited_once()
+        assert store.aput.call_args.args[2]["content"] == ["- Memory 1", "- Memory 2"]
+
+    def test_llm_reply_code_fence_is_unwrapped(self):
+        from middleware.memory_cleanup import MemoryCleanupMiddleware
+
+        store = MagicMock()
+        item = MagicMock()
+        item.key = "/memories/coding.txt"
+        item.value = {"content": [f"- Lesson {i}" for i in range(10)]}
+        store.search.return_value = [item]
+
+        reply = "```markdown\n- Wrap code in ```python``` fences\n- Lesson 2\n```"
+        with patch("middleware.memory_cleanup.get_llm") as mock_chat:
+            mock_chat.return_value.invoke.return_value = MagicMock(content=reply)
+            middleware = MemoryCleanupMiddleware(store, max_memories_per_file=3)
+            middleware.after_agent(state={}, runtime=MagicMock())
+
+        # Only the wrapping fence goes; fences inside a memory are kept
+        assert store.put.call_args.args[2]["content"] == ["- Wrap code in ```python``` fences", "- Lesson 2"]
+
+    def test_file_kept_as_is_by_llm_is_not_resent(self):
+        from middleware.memory_cleanup import MemoryCleanupMiddleware
+
+        store = MagicMock()
+        item = MagicMock()
+        item.key = "/memories/test.txt"
+        item.namespace = ("filesystem",)
+        item.updated_at = "2025-01-01T00:00:00"
+        content = [f"- Memory {i}" for i in range(10)]
+        item.value = {"content": content}
+        store.search.return_value = [item]
+
+        with patch("middleware.memory_cleanup.get_llm") as mock_chat:
+            mock_chat.return_value.invoke.return_value = MagicMock(content="\n".join(content))
+            middleware = MemoryCleanupMiddleware(store, max_memories_per_file=3)
+            middleware.after_agent(state={}, runtime=MagicMock())
+            middleware.after_agent(state={}, runtime=MagicMock())
+
+        mock_chat.return_value.invoke.assert_called_once()
+        store.put.assert_not_called()
+
+    def test_unchanged_files_are_not_rechecked(self):
+        from middleware.memory_cleanup import MemoryCleanupMiddleware
+
+        store = MagicMock()
+        item = MagicMock()
+        item.key = "/memories/test.txt"
+        item.namespace = ("filesystem",)
+        item.updated_at = "2025-01-01T00:00:00"
+        value = PropertyMock(return_value={"content": ["## Test", "- a"]})
+        type(item).value = value
+        store.search.return_value = [item]
+
+        middleware = MemoryCleanupMiddleware(store, max_memories_per_file=5)
+        middleware.after_agent(state={}, runtime=MagicMock())
+        middleware.after_agent(state={}, runtime=MagicMock())
+        assert value.call_count == 1
+
+        item.updated_at = "2025-01-02T00:00:00"
+        middleware.after_agent(state={}, runtime=MagicMock())
+        assert value.call_count == 2
+
     def test_only_processes_txt_files(self):
         from middleware.memory_cleanup import MemoryCleanupMiddleware
 
@@ -91,7 +249,7 @@ class TestMemoryCleanupMiddleware:
 
         store.search.return_value = [txt_item, other_item]
 
-        with patch("middleware.memory_cleanup.ChatOpenAI") as mock_chat:
+        with patch("middleware.memory_cleanup.get_llm") as mock_chat:
             middleware = MemoryCleanupMiddleware(store, max_memories_per_file=1)
             middleware.after_agent(state={}, runtime=MagicMock())
 
@@ -1,7 +1,7 @@
 """Lightweight middleware sanity checks."""
 
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 
 @pytest.mark.unit
@@ -21,3 +21,264 @@ def test_trim_prompt_contains_limit_placeholder():
 
     assert "{max_memories}" in TRIM_SYSTEM_PROMPT
     assert "{current_content}" in TRIM_SYSTEM_PROMPT
+
+
+def _tool_request(name, args=None):
+    request = MagicMock()
+    request.tool_call = {"name": name, "args": args or {}, "id": "call_1"}
+    return request
+
+
+@pytest.mark.unit
+def test_subagent_failure_becomes_error_message():
+    from middleware.subagent_dispatch import SubagentDispatchMiddleware
+
+    middleware = SubagentDispatchMiddleware()
+    request = _tool_request("task", {"subagent_type": "web-research-agent"})
+    handler = MagicMock(side_effect=RuntimeError("boom"))
+
+    result = middleware.wrap_tool_call(request, handler)
+
+    assert result.status == "error"
+    assert result.tool_call_id == "call_1"
+    assert "web-research-agent" in result.content
+
+
+@pytest.mark.unit
+def test_subagent_dispatch_ignores_other_tools():
+    from middleware.subagent_dispatch import SubagentDispatchMiddleware
+
+    middleware = SubagentDispatchMiddleware()
+    handler = MagicMock(side_effect=RuntimeError("boom"))
+
+    with pytest.raises(RuntimeError):
+        middleware.wrap_tool_call(_tool_request("web_search"), handler)
+
+
+@pytest.mark.unit
+async def test_subagent_dispatch_caps_concurrency():
+    import asyncio
+
+    from middleware.subagent_dispatch import SubagentDispatchMiddleware
+
+    middleware = SubagentDispatchMiddleware(max_concurrency=2)
+    running = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "done"
+
+    results = await asyncio.gather(*(middleware.awrap_tool_call(_tool_request("task"), handler) for _ in range(5)))
+
+    assert results == ["done"] * 5
+    assert peak == 2
+
+
+@pytest.mark.unit
+def test_tool_cache_returns_stored_result_for_identical_call():
+    from langchain_core.messages import ToolMessage
+    from middleware.tool_cache import ToolCacheMiddleware
+
+    middleware = ToolCacheMiddleware()
+    handler = MagicMock(return_value=ToolMessage(content="results", tool_call_id="call_1", name="web_search"))
+
+    first = middleware.wrap_tool_call(_tool_request("web_search", {"query": "NVDA"}), handler)
+    second_request = _tool_request("web_search", {"query": "NVDA"})
+    second_request.tool_call["id"] = "call_2"
+    second = middleware.wrap_tool_call(second_request, handler)
+
+    handler.assert_called_once()
+    assert first.content == second.content == "results"
+    assert second.tool_call_id == "call_2"
+
+
+@pytest.mark.unit
+def test_tool_cache_skips_errors_and_uncached_tools():
+    from langchain_core.messages import ToolMessage
+    from middleware.tool_cache import ToolCacheMiddleware
+
+    middleware = ToolCacheMiddleware(tool_names=("web_search",))
+    error = ToolMessage(content="failed", tool_call_id="call_1", name="web_search", status="error")
+    handler = MagicMock(return_value=error)
+
+    middleware.wrap_tool_call(_tool_request("web_search", {"query": "NVDA"}), handler)
+    middleware.wrap_tool_call(_tool_request("web_search", {"query": "NVDA"}), handler)
+    middleware.wrap_tool_call(_tool_request("read_file", {"file_path": "/x"}), handler)
+    middleware.wrap_tool_call(_tool_request("read_file", {"file_path": "/x"}), handler)
+
+    assert handler.call_count == 4
+
+
+@pytest.mark.unit
+def test_tool_cache_never_replays_task_or_command_results():
+    from langchain_core.messages import ToolMessage
+    from langgraph.types import Command
+    from middleware.tool_cache import ToolCacheMiddleware
+
+    message = ToolMessage(content="report", tool_call_id="call_1", name="task")
+    handler = MagicMock(return_value=Command(update={"messages": [message], "files": {"/plot.png": "..."}}))
+
+    # `task` isn't cached by default, and a Command's state update can't be replayed from a message
+    for middleware in (ToolCacheMiddleware(), ToolCacheMiddleware(tool_names=("task",))):
+        middleware.wrap_tool_call(_tool_request("task", {"description": "research NVDA"}), handler)
+        middleware.wrap_tool_call(_tool_request("task", {"description": "research NVDA"}), handler)
+
+    assert handler.call_count == 4
+
+
+@pytest.mark.unit
+def test_tool_cache_entries_expire_after_their_ttl():
+    from langchain_core.messages import ToolMessage
+    from middleware.tool_cache import ToolCacheMiddleware
+
+    ttl = MagicMock(return_value=3600)
+    middleware = ToolCacheMiddleware(ttl=ttl)
+    handler = MagicMock(return_value=ToolMessage(content="results", tool_call_id="call_1", name="web_search"))
+    request = _tool_request("web_search", {"query": "NVDA", "topic": "news"})
+
+    with patch("middleware.tool_cache.time.monotonic", return_value=1000.0):
+        middleware.wrap_tool_call(request, handler)
+    with patch("middleware.tool_cache.time.monotonic", return_value=4599.0):
+        middleware.wrap_tool_call(request, handler)
+    assert handler.call_count == 1
+
+    with patch("middleware.tool_cache.time.monotonic", return_value=4600.0):
+        middleware.wrap_tool_call(request, handler)
+    assert handler.call_count == 2
+    ttl.assert_called_with({"query": "NVDA", "topic": "news"})
+
+
+@pytest.mark.unit
+def test_compression_leaves_results_within_budget_untouched():
+    from langchain_core.messages import ToolMessage
+    from middleware.tool_output_compression import ToolOutputCompressionMiddleware
+
+    with patch("middleware.tool_output_compression.get_llm") as mock_chat:
+        middleware = ToolOutputCompressionMiddleware()
+        result = ToolMessage(content="short answer", tool_call_id="call_1")
+        out = middleware.wrap_tool_call(
+            _tool_request("task", {"subagent_type": "web-research-agent"}), MagicMock(return_value=result)
+        )
+
+    assert out is result
+    mock_chat.return_value.invoke.assert_not_called()
+
+
+@pytest.mark.unit
+def test_compression_summarizes_oversized_results():
+    from langchain_core.messages import ToolMessage
+    from middleware.tool_output_compression import ToolOutputCompressionMiddleware
+
+    report = "\n".join(f"- Finding {i}: revenue grew {i}% [Reuters](https://reuters.com/{i})" for i in range(200))
+
+    with patch("middleware.tool_output_compression.get_llm") as mock_chat:
+        mock_chat.return_value.invoke.return_value = MagicMock(content="- Summary [Reuters](https://reuters.com/1)")
+        middleware = ToolOutputCompressionMiddleware(budgets={"web-research-agent": 50})
+        out = middleware.wrap_tool_call(
+            _tool_request("task", {"subagent_type": "web-research-agent"}),
+            MagicMock(return_value=ToolMessage(content=report, tool_call_id="call_1")),
+        )
+
+    mock_chat.return_value.invoke.assert_called_once()
+    assert out.content == "- Summary [Reuters](https://reuters.com/1)"
+    assert out.tool_call_id == "call_1"
+
+
+@pytest.mark.unit
+def test_budget_governor_counts_tokens_and_tool_calls():
+    from langchain_core.messages import AIMessage
+    from middleware.budget_governor import BudgetGovernorMiddleware
+
+    middleware = BudgetGovernorMiddleware()
+    message = AIMessage(
+        content="",
+        tool_calls=[{"name": "task", "args": {}, "id": "call_1"}],
+        usage_metadata={"input_tokens": 900, "output_tokens": 100, "total_tokens": 1000},
+    )
+
+    update = middleware.after_model({"messages": [message], "budget_tokens_used": 500}, MagicMock())
+
+    assert update == {"budget_tokens_used": 1500, "budget_tool_calls": 1, "budget_model_calls": 1}
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("tool_calls_per_turn", [0, 1, 3])
+def test_budget_governor_fires_before_the_recursion_limit(tool_calls_per_turn):
+    from langchain_core.messages import AIMessage
+    from middleware.budget_governor import SUPERSTEPS_PER_TURN, SUPERVISOR_RECURSION_LIMIT, BudgetGovernorMiddleware
+
+    middleware = BudgetGovernorMiddleware()
+    state = middleware.before_agent({"messages": []}, MagicMock())
+    turns = 0
+    while middleware.exhausted_reason(state) is None:
+        calls = [{"name": "web_search", "args": {}, "id": f"call_{turns}_{i}"} for i in range(tool_calls_per_turn)]
+        state.update(middleware.after_model({**state, "messages": [AIMessage(content="", tool_calls=calls)]}, None))
+        turns += 1
+
+    # The tools-free wrap-up turn still has to fit under the cap, with room to spare
+    assert (turns + 1) * SUPERSTEPS_PER_TURN < SUPERVISOR_RECURSION_LIMIT * 0.75
+
+
+@pytest.mark.unit
+def test_budget_governor_removes_tools_once_exhausted():
+    from middleware.budget_governor import BudgetGovernorMiddleware
+
+    middleware = BudgetGovernorMiddleware(max_tool_calls=10)
+    handler = MagicMock()
+
+    within = MagicMock(state={"budget_tool_calls": 3})
+    middleware.wrap_model_call(within, handler)
+    handler.assert_called_with(within)
+
+    exhausted = MagicMock(state={"budget_tool_calls": 10}, messages=[])
+    middleware.wrap_model_call(exhausted, handler)
+    overrides = exhausted.override.call_args.kwargs
+    assert overrides["tools"] == []
+    assert "budget is exhausted" in overrides["messages"][-1].content
+    handler.assert_called_with(exhausted.override.return_value)
+
+
+@pytest.mark.unit
+def test_current_time_is_appended_to_end_of_system_prompt():
+    from langchain.agents.middleware import ModelRequest
+    from langchain_core.messages import SystemMessage
+    from middleware.current_time import CurrentTimeMiddleware
+
+    middleware = CurrentTimeMiddleware("Now: {current_time}")
+    state = {"messages": [], **middleware.before_agent({"messages": []}, MagicMock())}
+    request = ModelRequest(model=MagicMock(), messages=[], system_message=SystemMessage(content="Static"), state=state)
+    handler = MagicMock()
+
+    middleware.wrap_model_call(request, handler)
+    middleware.wrap_model_call(request, handler)
+
+    first, second = (call.args[0].system_message.content for call in handler.call_args_list)
+    assert first == f"Static\n\nNow: {state['current_time']}"
+    # Frozen for the run, so the prompt is identical on every model call
+    assert second == first
+
+
+@pytest.mark.unit
+def test_async_http_client_pools_per_event_loop():
+    import asyncio
+
+    import httpx
+    from llms import LoopLocalAsyncClient
+
+    client = LoopLocalAsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+
+    async def request():
+        response = await client.get("https://api.example.com/")
+        return response.status_code, client._loop_client()
+
+    first_status, first_pool = asyncio.run(request())
+    second_status, second_pool = asyncio.run(request())
+
+    assert first_status == second_status == 200
+    # A second loop gets its own pool instead of reusing connections owned by the closed first loop
+    assert first_pool is not second_pool